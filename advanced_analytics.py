@@ -1,8 +1,13 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 from typing import Dict, List
 
+from kpis import compute_market_kpis, demand_signal
+from pipeline_profiler import run_profiled, stage
+from revenue_simulation import simulate_promo_roi_table, simulate_scenario_table
+
 CSV_PATH = Path("C:\\Users\\divay\\Desktop\\cubby_diagram\\storage_market_indianapolis.csv")
 
 # You can change these for your demo
@@ -10,51 +15,8 @@ MY_FACILITY_NAME = "My Facility"
 MY_PRICE = 60.0    # your current price
 EST_UNITS = 20     # number of units of this type
 
-
-# ----------------------------------------------------
-# Basic KPI helper (similar to previous script)
-# ----------------------------------------------------
-
-def compute_market_kpis(df: pd.DataFrame, my_price: float, est_units: int) -> Dict:
-    df = df.copy().dropna(subset=["lowest_price"])
-    market_avg = df["lowest_price"].mean()
-    market_min = df["lowest_price"].min()
-    market_max = df["lowest_price"].max()
-
-    price_gap = market_avg - my_price
-    price_gap_pct = (price_gap / market_avg * 100) if market_avg else 0.0
-
-    promo_pressure = df["promo_flag"].mean() * 100
-
-    def demand_score(row):
-        if row["lowest_price"] >= market_avg and not row["promo_flag"]:
-            return 1.0
-        elif row["lowest_price"] >= market_avg and row["promo_flag"]:
-            return 0.8
-        elif row["lowest_price"] < market_avg and not row["promo_flag"]:
-            return 0.7
-        else:
-            return 0.5
-
-    df["demand_signal"] = df.apply(demand_score, axis=1)
-    occ_index = df["demand_signal"].mean() * 100
-
-    recommended_price = max(my_price, market_avg)
-    extra_per_unit = max(0.0, recommended_price - my_price)
-    annual_uplift = extra_per_unit * est_units * 12
-
-    return {
-        "market_avg": market_avg,
-        "market_min": market_min,
-        "market_max": market_max,
-        "price_gap": price_gap,
-        "price_gap_pct": price_gap_pct,
-        "promo_pressure": promo_pressure,
-        "occ_index": occ_index,
-        "recommended_price": recommended_price,
-        "annual_uplift": annual_uplift,
-        "extra_per_unit": extra_per_unit,
-    }
+# Price changes evaluated by the scenario tables (point estimate and Monte Carlo)
+SCENARIO_PRICE_CHANGES = [-0.10, -0.05, 0.0, 0.03, 0.05, 0.10]
 
 
 # ----------------------------------------------------
@@ -85,7 +47,7 @@ def build_scenario_table(kpis: Dict, my_price: float, est_units: int) -> pd.Data
         base_occ = 0.9
 
     scenarios: List[Dict] = []
-    for pct_change in [-0.10, -0.05, 0.0, 0.03, 0.05, 0.10]:
+    for pct_change in SCENARIO_PRICE_CHANGES:
         new_price = my_price * (1.0 + pct_change)
 
         # simple assumption: every +5% in price reduces occupancy by 2.5 points
@@ -137,7 +99,7 @@ def top_underpriced_chart(df: pd.DataFrame, output_path: Path):
     market_avg = df_plot["lowest_price"].mean()
     df_plot["underpricing_gap"] = market_avg - df_plot["lowest_price"]
     df_plot = df_plot[df_plot["underpricing_gap"] > 0]
-    df_plot = df_plot.sort_values("underpricing_gap", ascending=False).head(10)
+    df_plot = df_plot.nlargest(10, "underpricing_gap")
 
     if df_plot.empty:
         print("No underpriced competitors found for Top 10 chart.")
@@ -212,62 +174,55 @@ def price_rating_opportunity_chart(df: pd.DataFrame, output_path: Path):
 # 7. Neighborhood profit heatmap (distance band x price band)
 # ----------------------------------------------------
 
-def neighborhood_heatmap(df: pd.DataFrame, output_path: Path):
-    df_plot = df.copy().dropna(subset=["lowest_price", "distance_miles"])
-    if df_plot.empty:
-        print("Not enough distance/price data for heatmap.")
-        return
+def distance_band(distance: pd.Series) -> pd.Series:
+    """0–2 / 2–4 / 4–6 / 6+ mile bands."""
+    d = distance.to_numpy()
+    return pd.Series(
+        np.select([d <= 2, d <= 4, d <= 6], ["0–2 mi", "2–4 mi", "4–6 mi"], default="6+ mi"),
+        index=distance.index,
+    )
 
-    # Distance bands
-    def dist_band(d):
-        if d <= 2:
-            return "0–2 mi"
-        elif d <= 4:
-            return "2–4 mi"
-        elif d <= 6:
-            return "4–6 mi"
-        else:
-            return "6+ mi"
 
-    df_plot["dist_band"] = df_plot["distance_miles"].apply(dist_band)
+def price_tier(prices: pd.Series, q1: float, q2: float) -> pd.Series:
+    """Cheap / Mid / Premium split at the 33rd and 66th price percentiles q1, q2."""
+    p = prices.to_numpy()
+    return pd.Series(np.select([p <= q1, p <= q2], ["Cheap", "Mid"], default="Premium"), index=prices.index)
 
-    # Price bands: cheap / mid / premium via quantiles
-    q1 = df_plot["lowest_price"].quantile(0.33)
-    q2 = df_plot["lowest_price"].quantile(0.66)
 
-    def price_band(p):
-        if p <= q1:
-            return "Cheap"
-        elif p <= q2:
-            return "Mid"
-        else:
-            return "Premium"
+def neighborhood_pivot(df: pd.DataFrame) -> pd.DataFrame:
+    """Mean demand_signal by distance band (rows) and price tier (columns)."""
+    df_plot = df.dropna(subset=["lowest_price", "distance_miles"])
+    if df_plot.empty:
+        return pd.DataFrame()
 
-    df_plot["price_band"] = df_plot["lowest_price"].apply(price_band)
+    q1 = df_plot["lowest_price"].quantile(0.33)
+    q2 = df_plot["lowest_price"].quantile(0.66)
 
-    # Use demand_signal as proxy (recompute here)
+    # Use demand_signal as proxy
     market_avg = df_plot["lowest_price"].mean()
-
-    def demand_score(row):
-        if row["lowest_price"] >= market_avg and not row["promo_flag"]:
-            return 1.0
-        elif row["lowest_price"] >= market_avg and row["promo_flag"]:
-            return 0.8
-        elif row["lowest_price"] < market_avg and not row["promo_flag"]:
-            return 0.7
-        else:
-            return 0.5
-
-    df_plot["demand_signal"] = df_plot.apply(demand_score, axis=1)
-
-    pivot = pd.pivot_table(
-        df_plot,
+    return pd.pivot_table(
+        pd.DataFrame(
+            {
+                "dist_band": distance_band(df_plot["distance_miles"]),
+                "price_band": price_tier(df_plot["lowest_price"], q1, q2),
+                "demand_signal": demand_signal(df_plot, market_avg),
+            }
+        ),
         values="demand_signal",
         index="dist_band",
         columns="price_band",
         aggfunc="mean",
     )
 
+
+def neighborhood_heatmap(df: pd.DataFrame, output_path: Path):
+    if df.dropna(subset=["lowest_price", "distance_miles"]).empty:
+        print("Not enough distance/price data for heatmap.")
+        return
+    draw_neighborhood_heatmap(neighborhood_pivot(df), output_path)
+
+
+def draw_neighborhood_heatmap(pivot: pd.DataFrame, output_path: Path):
     if pivot.empty:
         print("Pivot for heatmap is empty.")
         return
@@ -354,26 +309,29 @@ def build_promo_roi_table(kpis: Dict, my_price: float, est_units: int) -> pd.Dat
 # 9. Good / Fair / Risky price bands
 # ----------------------------------------------------
 
+def price_position_band(prices: pd.Series, market_avg: float) -> pd.Series:
+    """Good (within ±5% of market avg) / Fair (5–10%) / Risky (>10%)."""
+    dev_pct = np.abs((prices.to_numpy() - market_avg) / market_avg * 100)
+    return pd.Series(
+        np.select([dev_pct <= 5, dev_pct <= 10], ["Good (±5%)", "Fair (5–10%)"], default="Risky (>10%)"),
+        index=prices.index,
+    )
+
+
+def price_band_shares(df: pd.DataFrame) -> pd.Series:
+    """Share of competitors (%) in each price position band."""
+    prices = df["lowest_price"].dropna()
+    return price_position_band(prices, prices.mean()).value_counts(normalize=True) * 100
+
+
 def price_band_share_chart(df: pd.DataFrame, output_path: Path):
-    df_plot = df.copy().dropna(subset=["lowest_price"])
-    if df_plot.empty:
+    if df["lowest_price"].dropna().empty:
         print("No price data for band share chart.")
         return
+    draw_price_band_share(price_band_shares(df), output_path)
 
-    market_avg = df_plot["lowest_price"].mean()
-
-    def band(row):
-        dev_pct = (row["lowest_price"] - market_avg) / market_avg * 100
-        if abs(dev_pct) <= 5:
-            return "Good (±5%)"
-        elif abs(dev_pct) <= 10:
-            return "Fair (5–10%)"
-        else:
-            return "Risky (>10%)"
-
-    df_plot["price_band"] = df_plot.apply(band, axis=1)
-    shares = df_plot["price_band"].value_counts(normalize=True) * 100
 
+def draw_price_band_share(shares: pd.Series, output_path: Path):
     fig, ax = plt.subplots(figsize=(5, 4))
     ax.bar(shares.index, shares.values)
     ax.set_ylabel("Share of competitors (%)")
@@ -423,54 +381,80 @@ def main():
     if not CSV_PATH.exists():
         raise FileNotFoundError(f"{CSV_PATH.resolve()} not found. Run build_dataset_from_html.py first.")
 
-    df = pd.read_csv(CSV_PATH)
+    with stage("read_csv") as s:
+        df = pd.read_csv(CSV_PATH)
+        s.set(rows=len(df))
     print(f"Loaded {len(df)} competitor rows from {CSV_PATH.name}")
 
-    kpis = compute_market_kpis(df, MY_PRICE, EST_UNITS)
+    with stage("compute_market_kpis", rows=len(df)):
+        kpis = compute_market_kpis(df, MY_PRICE, EST_UNITS)
     print("\nBasic KPIs:")
     for k, v in kpis.items():
         print(f"  {k}: {v:.2f}" if isinstance(v, float) else f"  {k}: {v}")
 
     # 1) Money on the table
-    mot_df = build_money_on_table(kpis, MY_PRICE, EST_UNITS)
-    mot_path = Path("money_on_table.csv")
-    mot_df.to_csv(mot_path, index=False)
+    with stage("table:money_on_table"):
+        mot_df = build_money_on_table(kpis, MY_PRICE, EST_UNITS)
+        mot_path = Path("money_on_table.csv")
+        mot_df.to_csv(mot_path, index=False)
     print(f"\nSaved 'Money on the Table' table to: {mot_path.resolve()}")
 
     # 2) Scenario table
-    scen_df = build_scenario_table(kpis, MY_PRICE, EST_UNITS)
-    scen_path = Path("price_scenarios.csv")
-    scen_df.to_csv(scen_path, index=False)
+    with stage("table:price_scenarios"):
+        scen_df = build_scenario_table(kpis, MY_PRICE, EST_UNITS)
+        scen_path = Path("price_scenarios.csv")
+        scen_df.to_csv(scen_path, index=False)
     print(f"Saved price scenario table to: {scen_path.resolve()}")
 
+    # 2b) Monte Carlo version of the scenario table
+    with stage("table:price_scenarios_mc"):
+        mc_df = simulate_scenario_table(kpis, MY_PRICE, EST_UNITS, SCENARIO_PRICE_CHANGES)
+        mc_path = Path("price_scenarios_mc.csv")
+        mc_df.to_csv(mc_path, index=False)
+    print(f"Saved Monte Carlo price scenario table to: {mc_path.resolve()}")
+
     # 3) Raise / Hold / Defend
     decision = classify_action(kpis)
     print(f"\nPricing action suggestion for this unit type: {decision}")
 
     # 4) Top 10 underpriced competitors chart
-    top_underpriced_chart(df, Path("top_underpriced.png"))
+    with stage("chart:top_underpriced"):
+        top_underpriced_chart(df, Path("top_underpriced.png"))
 
     # 5) Discount dependence chart
-    discount_dependence_chart(df, Path("discount_dependence.png"))
+    with stage("chart:discount_dependence"):
+        discount_dependence_chart(df, Path("discount_dependence.png"))
 
     # 6) Price–rating–opportunity bubble
-    price_rating_opportunity_chart(df, Path("price_rating_opportunity.png"))
+    with stage("chart:price_rating_opportunity"):
+        price_rating_opportunity_chart(df, Path("price_rating_opportunity.png"))
 
     # 7) Neighborhood profit heatmap
-    neighborhood_heatmap(df, Path("neighborhood_heatmap.png"))
+    with stage("chart:neighborhood_heatmap"):
+        neighborhood_heatmap(df, Path("neighborhood_heatmap.png"))
 
     # 8) Promo ROI snapshot table
-    promo_df = build_promo_roi_table(kpis, MY_PRICE, EST_UNITS)
-    promo_path = Path("promo_roi_snapshot.csv")
-    promo_df.to_csv(promo_path, index=False)
+    with stage("table:promo_roi_snapshot"):
+        promo_df = build_promo_roi_table(kpis, MY_PRICE, EST_UNITS)
+        promo_path = Path("promo_roi_snapshot.csv")
+        promo_df.to_csv(promo_path, index=False)
     print(f"Saved promo ROI snapshot table to: {promo_path.resolve()}")
 
+    # 8b) Monte Carlo promo ROI table
+    with stage("table:promo_roi_mc"):
+        promo_mc_df = simulate_promo_roi_table(kpis, MY_PRICE, EST_UNITS)
+        promo_mc_path = Path("promo_roi_mc.csv")
+        promo_mc_df.to_csv(promo_mc_path, index=False)
+    print(f"Saved Monte Carlo promo ROI table to: {promo_mc_path.resolve()}")
+
     # 9) Price band share chart
-    price_band_share_chart(df, Path("price_band_share.png"))
+    with stage("chart:price_band_share"):
+        price_band_share_chart(df, Path("price_band_share.png"))
 
     # 10) Trend-over-time chart
-    trend_over_time_chart(df, MY_PRICE, Path("market_trend.png"))
+    with stage("chart:market_trend"):
+        trend_over_time_chart(df, MY_PRICE, Path("market_trend.png"))
 
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main, "advanced_analytics")
@@ -4,10 +4,14 @@
 # 2. Computes market KPIs and a rough revenue uplift estimate
 # 3. Saves multiple charts that you can use in your presentation
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from kpis import compute_market_kpis, demand_signal
+from pipeline_profiler import run_profiled, stage
+
 CSV_PATH = Path("C:\\Users\\divay\\Desktop\\cubby_diagram\\storage_market_indianapolis.csv")
 
 # Output image paths
@@ -26,56 +30,6 @@ MY_PRICE = 60.0          # your current price for this unit type
 EST_UNITS = 20           # how many such units you have (for revenue uplift calc)
 
 
-# -------------------------------------------------------------------
-# KPI COMPUTATION
-# -------------------------------------------------------------------
-
-def compute_market_kpis(df: pd.DataFrame, my_price: float, est_units: int = 20) -> dict:
-    """Compute simple KPIs from the market listing dataset."""
-    df = df.copy().dropna(subset=["lowest_price"])
-
-    market_avg = df["lowest_price"].mean()
-    market_min = df["lowest_price"].min()
-    market_max = df["lowest_price"].max()
-
-    price_gap = market_avg - my_price
-    price_gap_pct = (price_gap / market_avg * 100) if market_avg else 0.0
-
-    # Promo pressure = share of competitors with a discount
-    promo_pressure = df["promo_flag"].mean() * 100
-
-    # Simple demand / occupancy index based on price level and promo usage
-    def demand_score(row):
-        if row["lowest_price"] >= market_avg and not row["promo_flag"]:
-            return 1.0       # high demand, no discount
-        elif row["lowest_price"] >= market_avg and row["promo_flag"]:
-            return 0.8
-        elif row["lowest_price"] < market_avg and not row["promo_flag"]:
-            return 0.7
-        else:
-            return 0.5       # cheap + discounted = weaker demand
-
-    df["demand_signal"] = df.apply(demand_score, axis=1)
-    occ_index = df["demand_signal"].mean() * 100  # 0–100 scale
-
-    # Recommended price: at least the market average if you are below it
-    recommended_price = max(my_price, market_avg)
-    extra_per_unit = max(0.0, recommended_price - my_price)
-    annual_uplift = extra_per_unit * est_units * 12
-
-    return {
-        "market_avg": market_avg,
-        "market_min": market_min,
-        "market_max": market_max,
-        "price_gap": price_gap,
-        "price_gap_pct": price_gap_pct,
-        "promo_pressure": promo_pressure,
-        "occ_index": occ_index,
-        "recommended_price": recommended_price,
-        "annual_uplift": annual_uplift,
-    }
-
-
 # -------------------------------------------------------------------
 # FIGURE HELPERS
 # -------------------------------------------------------------------
@@ -99,10 +53,14 @@ def price_comparison_fig(df: pd.DataFrame, my_price: float, my_label: str = "My
 
 def price_histogram_fig(df: pd.DataFrame):
     """Histogram showing the distribution of competitor prices."""
-    df_plot = df.copy().dropna(subset=["lowest_price"])
+    counts, edges = np.histogram(df["lowest_price"].dropna(), bins=10)
+    return price_histogram_counts_fig(counts, edges)
+
 
+def price_histogram_counts_fig(counts: np.ndarray, edges: np.ndarray):
+    """Price histogram from precomputed bin counts and edges."""
     fig, ax = plt.subplots(figsize=(6, 4))
-    ax.hist(df_plot["lowest_price"], bins=10)
+    ax.hist(edges[:-1], bins=edges, weights=counts)
     ax.set_xlabel("Lowest monthly price ($)")
     ax.set_ylabel("Number of competitors")
     ax.set_title("Market Price Distribution")
@@ -148,8 +106,11 @@ def rating_vs_price_fig(df: pd.DataFrame, my_price: float, my_label: str = "My F
 
 def promo_pressure_fig(df: pd.DataFrame):
     """Bar chart showing share of competitors with and without promos."""
-    df_plot = df.copy()
-    promo_share = df_plot["promo_flag"].mean()
+    return promo_share_fig(df["promo_flag"].mean())
+
+
+def promo_share_fig(promo_share: float):
+    """Promo pressure bar chart from a precomputed promo share (0–1)."""
     no_promo_share = 1 - promo_share
 
     labels = ["With promo", "No promo"]
@@ -187,18 +148,7 @@ def opportunity_quadrant_fig(df: pd.DataFrame, my_price: float, my_label: str =
     df_plot = df.copy().dropna(subset=["lowest_price"])
     market_avg = df_plot["lowest_price"].mean()
 
-    # Rebuild demand_signal similar to KPI function
-    def demand_score(row):
-        if row["lowest_price"] >= market_avg and not row["promo_flag"]:
-            return 1.0
-        elif row["lowest_price"] >= market_avg and row["promo_flag"]:
-            return 0.8
-        elif row["lowest_price"] < market_avg and not row["promo_flag"]:
-            return 0.7
-        else:
-            return 0.5
-
-    df_plot["demand_signal"] = df_plot.apply(demand_score, axis=1)
+    df_plot["demand_signal"] = demand_signal(df_plot, market_avg)
     df_plot["price_deviation"] = df_plot["lowest_price"] - market_avg
 
     fig, ax = plt.subplots(figsize=(6, 4))
@@ -219,24 +169,28 @@ def opportunity_quadrant_fig(df: pd.DataFrame, my_price: float, my_label: str =
     return fig
 
 
+def rating_bucket(ratings: pd.Series) -> pd.Series:
+    """Buckets: <4.0, 4.0–4.5, >4.5"""
+    r = ratings.to_numpy()
+    return pd.Series(np.select([r < 4.0, r <= 4.5], ["<4.0★", "4.0–4.5★"], default=">4.5★"), index=ratings.index)
+
+
+def rating_promo_shares(df: pd.DataFrame) -> pd.Series:
+    """Share of competitors with promos (%) per rating bucket."""
+    df_plot = df.dropna(subset=["rating"])
+    return df_plot["promo_flag"].groupby(rating_bucket(df_plot["rating"])).mean() * 100
+
+
 def rating_promo_matrix_fig(df: pd.DataFrame):
     """
     Bar chart: rating buckets vs promo usage share.
     Buckets: <4.0, 4.0–4.5, >4.5
     """
-    df_plot = df.copy().dropna(subset=["rating"])
-
-    def bucket(r):
-        if r < 4.0:
-            return "<4.0★"
-        elif r <= 4.5:
-            return "4.0–4.5★"
-        else:
-            return ">4.5★"
+    return rating_promo_shares_fig(rating_promo_shares(df))
 
-    df_plot["rating_bucket"] = df_plot["rating"].apply(bucket)
 
-    grouped = df_plot.groupby("rating_bucket")["promo_flag"].mean() * 100
+def rating_promo_shares_fig(grouped: pd.Series):
+    """Rating bucket bar chart from precomputed promo shares."""
     buckets = grouped.index.tolist()
     values = grouped.values.tolist()
 
@@ -258,10 +212,13 @@ def main():
             f"CSV not found: {CSV_PATH.resolve()} – run build_dataset_from_html.py first."
         )
 
-    df = pd.read_csv(CSV_PATH)
+    with stage("read_csv") as s:
+        df = pd.read_csv(CSV_PATH)
+        s.set(rows=len(df))
     print(f"Loaded {len(df)} competitors from {CSV_PATH.name}")
 
-    kpis = compute_market_kpis(df, MY_PRICE, est_units=EST_UNITS)
+    with stage("compute_market_kpis", rows=len(df)):
+        kpis = compute_market_kpis(df, MY_PRICE, est_units=EST_UNITS)
 
     print("\n=== Market KPIs (from Storage.com dataset) ===")
     print(f"Market avg price:     ${kpis['market_avg']:.2f}")
@@ -279,45 +236,53 @@ def main():
     )
 
     # 1) Price comparison
-    fig = price_comparison_fig(df, MY_PRICE, MY_FACILITY_NAME)
-    fig.savefig(PRICE_COMPARISON_PNG, dpi=150, bbox_inches="tight")
-    print(f"\nSaved price comparison chart to: {PRICE_COMPARISON_PNG.resolve()}")
+    with stage("chart:price_comparison"):
+        fig = price_comparison_fig(df, MY_PRICE, MY_FACILITY_NAME)
+        fig.savefig(PRICE_COMPARISON_PNG, dpi=150, bbox_inches="tight")
+        print(f"\nSaved price comparison chart to: {PRICE_COMPARISON_PNG.resolve()}")
 
     # 2) Market price histogram
-    fig = price_histogram_fig(df)
-    fig.savefig(PRICE_HISTOGRAM_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved price histogram to: {PRICE_HISTOGRAM_PNG.resolve()}")
+    with stage("chart:price_histogram"):
+        fig = price_histogram_fig(df)
+        fig.savefig(PRICE_HISTOGRAM_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved price histogram to: {PRICE_HISTOGRAM_PNG.resolve()}")
 
     # 3) Price vs distance scatter
-    fig = price_vs_distance_fig(df, MY_PRICE, MY_FACILITY_NAME)
-    fig.savefig(PRICE_DISTANCE_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved price vs distance chart to: {PRICE_DISTANCE_PNG.resolve()}")
+    with stage("chart:price_vs_distance"):
+        fig = price_vs_distance_fig(df, MY_PRICE, MY_FACILITY_NAME)
+        fig.savefig(PRICE_DISTANCE_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved price vs distance chart to: {PRICE_DISTANCE_PNG.resolve()}")
 
     # 4) Rating vs price scatter
-    fig = rating_vs_price_fig(df, MY_PRICE, MY_FACILITY_NAME)
-    fig.savefig(RATING_PRICE_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved rating vs price chart to: {RATING_PRICE_PNG.resolve()}")
+    with stage("chart:rating_vs_price"):
+        fig = rating_vs_price_fig(df, MY_PRICE, MY_FACILITY_NAME)
+        fig.savefig(RATING_PRICE_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved rating vs price chart to: {RATING_PRICE_PNG.resolve()}")
 
     # 5) Promo pressure bar chart
-    fig = promo_pressure_fig(df)
-    fig.savefig(PROMO_PRESSURE_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved promo pressure chart to: {PROMO_PRESSURE_PNG.resolve()}")
+    with stage("chart:promo_pressure"):
+        fig = promo_pressure_fig(df)
+        fig.savefig(PROMO_PRESSURE_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved promo pressure chart to: {PROMO_PRESSURE_PNG.resolve()}")
 
     # 6) Revenue uplift bar chart
-    fig = revenue_uplift_fig(MY_PRICE, kpis, EST_UNITS)
-    fig.savefig(REVENUE_UPLIFT_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved revenue uplift chart to: {REVENUE_UPLIFT_PNG.resolve()}")
+    with stage("chart:revenue_uplift"):
+        fig = revenue_uplift_fig(MY_PRICE, kpis, EST_UNITS)
+        fig.savefig(REVENUE_UPLIFT_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved revenue uplift chart to: {REVENUE_UPLIFT_PNG.resolve()}")
 
     # 7) Opportunity quadrant chart
-    fig = opportunity_quadrant_fig(df, MY_PRICE, MY_FACILITY_NAME)
-    fig.savefig(OPPORTUNITY_QUADRANT_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved opportunity quadrant chart to: {OPPORTUNITY_QUADRANT_PNG.resolve()}")
+    with stage("chart:opportunity_quadrant"):
+        fig = opportunity_quadrant_fig(df, MY_PRICE, MY_FACILITY_NAME)
+        fig.savefig(OPPORTUNITY_QUADRANT_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved opportunity quadrant chart to: {OPPORTUNITY_QUADRANT_PNG.resolve()}")
 
     # 8) Rating vs promo matrix
-    fig = rating_promo_matrix_fig(df)
-    fig.savefig(RATING_PROMO_MATRIX_PNG, dpi=150, bbox_inches="tight")
-    print(f"Saved rating-promo matrix chart to: {RATING_PROMO_MATRIX_PNG.resolve()}")
+    with stage("chart:rating_promo_matrix"):
+        fig = rating_promo_matrix_fig(df)
+        fig.savefig(RATING_PROMO_MATRIX_PNG, dpi=150, bbox_inches="tight")
+        print(f"Saved rating-promo matrix chart to: {RATING_PROMO_MATRIX_PNG.resolve()}")
 
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main, "analyze_kpis_and_charts")
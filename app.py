@@ -1,9 +1,19 @@
 # app.py
+import time
+
 import pandas as pd
 import streamlit as st
 
-from storage_scraper import scrape_city_market
-from kpis import compute_market_kpis, price_comparison_fig
+from storage_scraper import iter_city_market_page_tables
+from advanced_analytics import SCENARIO_PRICE_CHANGES
+from analyze_kpis_and_charts import price_comparison_fig
+from kpis import compute_kpis_by_unit_size, compute_market_kpis
+from revenue_simulation import simulate_scenario_table
+
+SCRAPE_CACHE_TTL = 60 * 60  # seconds a scraped market stays fresh
+UNIT_SIZE_SUMMARY_COLUMNS = [
+    "unit_size", "n_competitors", "market_avg", "market_min", "market_max", "promo_pressure", "occ_index",
+]
 
 st.set_page_config(page_title="Self-Storage Market Analyzer", layout="wide")
 st.title("Self-Storage Market Analyzer (Storage.com Data)")
@@ -18,51 +28,150 @@ with col_in1:
     state = st.text_input("State (as word, like 'california' or 'indiana')", "california")
     city = st.text_input("City slug (as in URL, like 'san-diego')", "san-diego")
 with col_in2:
-    unit_size = st.selectbox("Unit size (for analysis label)", ["5x5", "10x10", "10x20"], index=1)
+    unit_size = st.selectbox("Unit size", ["5x5", "5x10", "10x10", "10x15", "10x20"], index=2)
     my_price = st.number_input("Your current monthly price ($)", min_value=0.0, value=185.0)
     est_units = st.number_input("Number of units of this type", min_value=1, value=20)
 
 zip_code = st.text_input("ZIP code (optional, for reporting)", "92101")
 
+
+# -------------------------------------------------------------------
+# CACHES (survive reruns, so moving a slider does not re-scrape)
+# -------------------------------------------------------------------
+
+@st.cache_resource
+def scrape_store() -> dict:
+    """Market key -> (scraped_at, facility_rows, unit_rows). Shared across reruns and sessions."""
+    return {}
+
+
+def fresh_scrape(store: dict, key: tuple):
+    """The stored scrape for key if still fresh; expired entries are dropped from the store."""
+    now = time.time()
+    for expired in [k for k, (scraped_at, _, _) in list(store.items()) if now - scraped_at >= SCRAPE_CACHE_TTL]:
+        store.pop(expired, None)
+    return store.get(key)
+
+
+def unit_size_listings(facility_rows: list, unit_rows: list, unit_size: str) -> pd.DataFrame:
+    """
+    Competitor listings for one unit size from the single scrape. Falls back to the
+    card-level "from" prices only when the pages carry no per-unit table at all;
+    if other sizes are listed but not this one, the result is empty.
+    """
+    units = pd.DataFrame(unit_rows)
+    if units.empty:
+        return pd.DataFrame(facility_rows).assign(unit_size=unit_size)
+    return units[units["unit_size"] == unit_size].reset_index(drop=True)
+
+
+@st.cache_data(show_spinner=False)
+def cached_kpis(df: pd.DataFrame, my_price: float, est_units: int) -> dict:
+    return compute_market_kpis(df, my_price, est_units=est_units)
+
+
+@st.cache_data(show_spinner=False)
+def cached_unit_size_summary(units: pd.DataFrame) -> pd.DataFrame:
+    """Market-side KPIs per unit size (columns that do not depend on your own price)."""
+    sizes = units["unit_size"].dropna().unique()
+    table = compute_kpis_by_unit_size(units, dict.fromkeys(sizes, 0.0), dict.fromkeys(sizes, 0))
+    return table[UNIT_SIZE_SUMMARY_COLUMNS] if not table.empty else table
+
+
+@st.cache_data(show_spinner=False)
+def cached_scenario_simulation(kpis: dict, my_price: float, est_units: int) -> pd.DataFrame:
+    return simulate_scenario_table(kpis, my_price, est_units, SCENARIO_PRICE_CHANGES, seed=0)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16, ttl=SCRAPE_CACHE_TTL)
+def cached_price_comparison_fig(df: pd.DataFrame, my_price: float):
+    return price_comparison_fig(df, my_price)
+
+
+def render_kpis(kpis: dict):
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Market avg price", f"${kpis['market_avg']:.0f}")
+    col2.metric("Your price gap", f"${kpis['price_gap']:.0f}", f"{kpis['price_gap_pct']:.1f}%")
+    col3.metric("Promo pressure in market", f"{kpis['promo_pressure']:.1f}%")
+
+    col4, col5 = st.columns(2)
+    col4.metric("Demand / occupancy index", f"{kpis['occ_index']:.1f} / 100")
+    col5.metric("Recommended price", f"${kpis['recommended_price']:.0f}")
+
+    st.metric(
+        "Estimated annual revenue uplift",
+        f"${kpis['annual_uplift']:,.0f}",
+        help="If you move to the recommended price for this unit size."
+    )
+
+
+# -------------------------------------------------------------------
+# ANALYSIS
+# -------------------------------------------------------------------
+
 if st.button("Analyze my market"):
-    with st.spinner("Fetching competitor data from Storage.com..."):
-        rows = scrape_city_market(state, city, zip_code=zip_code, unit_size=unit_size)
-        df = pd.DataFrame(rows)
+    # One scrape covers every unit size, so the unit size is not part of the key
+    st.session_state["active_market"] = (state.strip().lower(), city.strip().lower(), zip_code.strip())
 
-    if df.empty:
-        st.error("No listings found or selectors not configured yet.")
+if "active_market" in st.session_state:
+    m_state, m_city, m_zip = st.session_state["active_market"]
+    store = scrape_store()
+
+    status_slot = st.empty()
+    st.subheader("1. Raw dataset from Storage.com")
+    table_slot = st.empty()
+    st.subheader("2. KPIs and Revenue Impact")
+    kpi_slot = st.empty()
+
+    cached = fresh_scrape(store, st.session_state["active_market"])
+    if cached:
+        facility_rows, unit_rows = cached[1], cached[2]
     else:
-        st.success(f"Collected {len(df)} competitor listings from Storage.com.")
+        # Stream pages into the table and KPIs as they arrive
+        facility_rows, unit_rows = [], []
+        for page_no, (page_rows, page_units) in enumerate(
+            iter_city_market_page_tables(m_state, m_city, zip_code=m_zip), start=1
+        ):
+            facility_rows.extend(page_rows)
+            unit_rows.extend(page_units)
+            df = unit_size_listings(facility_rows, unit_rows, unit_size)
+            status_slot.info(f"Fetched page {page_no} – {len(facility_rows)} competitor facilities so far...")
+            table_slot.dataframe(df)
+            if not df.empty and df["lowest_price"].notna().any():
+                with kpi_slot.container():
+                    render_kpis(compute_market_kpis(df, my_price, est_units=est_units))
 
-        st.subheader("1. Raw dataset from Storage.com")
-        st.dataframe(df)
+        store[st.session_state["active_market"]] = (time.time(), facility_rows, unit_rows)
 
-        st.subheader("2. KPIs and Revenue Impact")
-        kpis = compute_market_kpis(df, my_price, est_units=est_units)
+    df = unit_size_listings(facility_rows, unit_rows, unit_size)
 
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Market avg price", f"${kpis['market_avg']:.0f}")
-        col2.metric("Your price gap", f"${kpis['price_gap']:.0f}", f"{kpis['price_gap_pct']:.1f}%")
-        col3.metric("Promo pressure in market", f"{kpis['promo_pressure']:.1f}%")
+    if unit_rows:
+        with st.expander("Market by unit size (same scrape)"):
+            st.dataframe(cached_unit_size_summary(pd.DataFrame(unit_rows)))
 
-        col4, col5 = st.columns(2)
-        col4.metric("Demand / occupancy index", f"{kpis['occ_index']:.1f} / 100")
-        col5.metric("Recommended price", f"${kpis['recommended_price']:.0f}")
+    if df.empty or df["lowest_price"].dropna().empty:
+        status_slot.empty()
+        table_slot.empty()
+        if unit_rows:
+            st.warning(f"No competitors list {unit_size} units in this market – pick another unit size.")
+        else:
+            st.error("No listings found or selectors not configured yet.")
+    else:
+        status_slot.success(f"Collected {len(df)} competitor listings for {unit_size} units from Storage.com.")
+        table_slot.dataframe(df)
 
-        st.metric(
-            "Estimated annual revenue uplift",
-            f"${kpis['annual_uplift']:,.0f}",
-            help="If you move to the recommended price for this unit size."
-        )
+        kpis = cached_kpis(df, my_price, est_units)
+        with kpi_slot.container():
+            render_kpis(kpis)
 
         st.subheader("3. Visualization example: price comparison")
-        fig = price_comparison_fig(df, my_price)
+        fig = cached_price_comparison_fig(df, my_price)
         st.pyplot(fig)
 
         st.subheader("4. Narrative summary for the operator")
         if kpis["price_gap"] > 0:
             st.write(
-                f"Based on Storage.com listings for {unit_size} units in {city.title()}, {state.title()}, "
+                f"Based on Storage.com listings for {unit_size} units in {m_city.title()}, {m_state.title()}, "
                 f"your price (${my_price:.0f}) is **below** the market average (${kpis['market_avg']:.0f}). "
                 f"With a demand index of {kpis['occ_index']:.1f}, you can move toward the recommended price "
                 f"of about ${kpis['recommended_price']:.0f} without losing competitiveness. "
@@ -76,3 +185,10 @@ if st.button("Analyze my market"):
                 f"of {kpis['promo_pressure']:.1f}%, it may be better to hold your price and focus on "
                 "amenities and service rather than increasing it further."
             )
+
+        st.subheader("5. Price change scenarios (Monte Carlo)")
+        st.caption(
+            "Annual revenue for each price change across 100,000 simulated draws of demand "
+            "elasticity, promo lift and market drift."
+        )
+        st.dataframe(cached_scenario_simulation(kpis, my_price, est_units))
@@ -0,0 +1,327 @@
+# arrow_handoff.py
+#
+# Arrow IPC hand-off of listing data between scrape, KPI and chart processes.
+#
+# 1. The scrape stage appends each parsed page as an Arrow record batch to an
+#    IPC file, by default in /dev/shm so the file lives in shared memory
+# 2. KPI and chart workers memory-map that file; numeric columns are handed to
+#    pandas without copying (floats are stored with NaN, not a null bitmap,
+#    so they convert zero-copy)
+# 3. The KPI worker streams batch by batch through the chunked aggregations
+#    (chunked_analysis.py); the chart worker builds one DataFrame for the charts
+# 4. benchmark_handoff() compares this with the CSV round trip used by the
+#    report scripts today
+#
+# Usage:
+#   python arrow_handoff.py report storage_market_indianapolis.csv --out-dir charts
+#   python arrow_handoff.py bench --scales 10000 100000
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import chunked_analysis as ca
+from kpis import compute_market_kpis
+from storage_scraper import BASE_URL, MAX_PAGES, iter_city_market_page_tables
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+SHM_DIR = Path("/dev/shm")
+HANDOFF_DIR = SHM_DIR if SHM_DIR.is_dir() else Path(tempfile.gettempdir())
+
+FLOAT_COLUMNS = [
+    "distance_miles", "lowest_price", "starting_price", "rating", "rating_count", "latitude", "longitude",
+]
+BOOL_COLUMNS = ["promo_flag"]
+
+CHART_OUTPUTS = [
+    "price_comparison_chart", "price_histogram_chart", "price_vs_distance_chart",
+    "rating_vs_price_chart", "promo_pressure_chart", "opportunity_quadrant_chart",
+]
+
+MY_PRICE = 60.0
+EST_UNITS = 20
+
+
+def _require_arrow():
+    if pa is None:
+        raise ImportError("Arrow hand-off needs pyarrow: pip install pyarrow")
+
+
+# -------------------------------------------------------------------
+# WRITE
+# -------------------------------------------------------------------
+
+def listing_schema(df: pd.DataFrame) -> "pa.Schema":
+    """Fixed schema for a listing frame: known numeric / bool columns, strings otherwise."""
+    _require_arrow()
+    fields = []
+    for col in df.columns:
+        if col in FLOAT_COLUMNS or (col not in BOOL_COLUMNS and pd.api.types.is_float_dtype(df[col])):
+            fields.append(pa.field(col, pa.float64()))
+        elif col in BOOL_COLUMNS or pd.api.types.is_bool_dtype(df[col]):
+            fields.append(pa.field(col, pa.bool_()))
+        elif pd.api.types.is_integer_dtype(df[col]):
+            fields.append(pa.field(col, pa.int64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def to_record_batch(df: pd.DataFrame, schema: "pa.Schema") -> "pa.RecordBatch":
+    """
+    Convert a listing frame to a record batch. Missing floats stay NaN so readers
+    avoid a copy; missing bools become nulls.
+    """
+    arrays = []
+    for field in schema:
+        col = df[field.name] if field.name in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if pa.types.is_floating(field.type):
+            arrays.append(pa.array(pd.to_numeric(col, errors="coerce").to_numpy(np.float64), type=field.type))
+        elif pa.types.is_boolean(field.type):
+            # Nullable: a missing promo flag must stay missing for the KPIs
+            arrays.append(pa.array(col.astype("boolean"), type=field.type, from_pandas=True))
+        elif pa.types.is_integer(field.type):
+            arrays.append(pa.array(col.to_numpy(np.int64), type=field.type))
+        else:
+            arrays.append(pa.array(col.astype("string"), type=field.type, from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ListingBatchWriter:
+    """
+    Append listing pages to an Arrow IPC file as record batches. The file is
+    written under a temporary name and renamed on close, so readers only ever
+    see a complete file.
+    """
+
+    def __init__(self, path: Path, schema: Optional["pa.Schema"] = None):
+        _require_arrow()
+        self.path = Path(path)
+        self.tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.schema = schema
+        self._sink = None
+        self._writer = None
+        self.rows = 0
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        if self._writer is None:
+            self.schema = self.schema or listing_schema(df)
+            self._sink = pa.OSFile(str(self.tmp_path), "wb")
+            # Uncompressed, so memory-mapped readers get the buffers as-is
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+        self._writer.write_batch(to_record_batch(df, self.schema))
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._sink.close()
+        os.replace(self.tmp_path, self.path)
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_listings(df: pd.DataFrame, path: Path) -> Path:
+    """Write a whole listing frame as a single record batch."""
+    with ListingBatchWriter(path) as writer:
+        writer.write(df)
+    return Path(path)
+
+
+def scrape_to_arrow(
+    state: str, city: str, path: Path, zip_code: Optional[str] = None, max_pages: int = MAX_PAGES,
+    base_url: str = BASE_URL,
+) -> int:
+    """Scrape stage: write each results page as a record batch as soon as it is parsed."""
+    with ListingBatchWriter(path) as writer:
+        for rows, _ in iter_city_market_page_tables(state, city, zip_code, max_pages, base_url):
+            writer.write(pd.DataFrame(rows))
+    return writer.rows
+
+
+# -------------------------------------------------------------------
+# READ
+# -------------------------------------------------------------------
+
+def open_listings(path: Path) -> "pa.Table":
+    """Memory-map an IPC file; the returned table's buffers point into the mapping."""
+    _require_arrow()
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _to_frame(data) -> pd.DataFrame:
+    # split_blocks keeps one pandas block per column, so single-chunk numeric
+    # columns without nulls are wrapped rather than copied into a 2-D block
+    frame = data.to_pandas(split_blocks=True)
+    # Null flags come back as None; use NaN like read_csv, which the KPIs count as promo
+    for col in BOOL_COLUMNS:
+        if col in frame.columns and frame[col].dtype == object:
+            frame[col] = frame[col].where(frame[col].notna(), np.nan)
+    return frame
+
+
+def iter_listing_frames(path: Path, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Yield one DataFrame per record batch (zero-copy for the float columns)."""
+    table = open_listings(path)
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    for batch in table.to_batches():
+        yield _to_frame(batch)
+
+
+def read_listings(path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """All batches as one DataFrame (zero-copy for float columns of single-batch files)."""
+    table = open_listings(path)
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    return _to_frame(table)
+
+
+# -------------------------------------------------------------------
+# WORKERS
+# -------------------------------------------------------------------
+
+def kpi_worker(path: Path, my_price: float, est_units: int) -> Dict:
+    """KPIs and aggregate chart inputs, streamed batch by batch from the mapped file."""
+    partials = None
+    for frame in iter_listing_frames(path, ca.COLUMNS):
+        partials = ca.merge_partials(partials, ca.chunk_partials(frame.reindex(columns=ca.COLUMNS)))
+    if partials is None or partials["price_counts"].empty:
+        raise ValueError(f"No priced listings in {path}")
+    return ca.finalise(partials, my_price, est_units)
+
+
+def chart_worker(path: Path, outputs: List[str], my_price: float, est_units: int, out_dir: Path) -> Dict:
+    """Render report charts from the mapped file."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from report_pipeline import run_report
+
+    return run_report(read_listings(path), outputs, my_price, est_units, out_dir)
+
+
+def run_handoff_report(
+    df: pd.DataFrame,
+    my_price: float,
+    est_units: int,
+    out_dir: Path = Path("."),
+    chart_outputs: Iterable[str] = CHART_OUTPUTS,
+    handoff_dir: Path = HANDOFF_DIR,
+) -> Dict:
+    """Publish df once as Arrow IPC, then run the KPI and chart workers in separate processes."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    path = Path(handoff_dir) / f"listings-{os.getpid()}.arrow"
+    write_listings(df, path)
+    try:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            kpi_future = pool.submit(kpi_worker, path, my_price, est_units)
+            chart_future = pool.submit(chart_worker, path, list(chart_outputs), my_price, est_units, Path(out_dir))
+            return {"results": kpi_future.result(), "charts": chart_future.result()}
+    finally:
+        path.unlink(missing_ok=True)
+
+
+# -------------------------------------------------------------------
+# BENCHMARK: Arrow vs CSV hand-off
+# -------------------------------------------------------------------
+
+def _csv_reader(path: Path, my_price: float, est_units: int) -> Dict:
+    return compute_market_kpis(pd.read_csv(path), my_price, est_units)
+
+
+def _arrow_reader(path: Path, my_price: float, est_units: int) -> Dict:
+    return compute_market_kpis(read_listings(path), my_price, est_units)
+
+
+def benchmark_handoff(scales: List[int], repeats: int = 5, handoff_dir: Path = HANDOFF_DIR) -> pd.DataFrame:
+    """
+    Time write (producer) and read + KPIs (consumer, in another process) for the
+    CSV and Arrow hand-offs. The worker pool is started once so process start-up
+    is not counted.
+    """
+    from benchmark_suite import measure
+    from synthetic_market import generate_market_listings
+
+    _require_arrow()
+    rows = []
+    formats = {
+        "csv": (lambda df, p: df.to_csv(p, index=False), _csv_reader, ".csv"),
+        "arrow": (write_listings, _arrow_reader, ".arrow"),
+    }
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(int).result()
+        for n in scales:
+            df = generate_market_listings(n, n_markets=4)
+            for fmt, (writer, reader, suffix) in formats.items():
+                path = Path(handoff_dir) / f"handoff-bench-{os.getpid()}{suffix}"
+                write = measure(lambda: writer(df, path), n, repeats)
+                read = measure(lambda: pool.submit(reader, path, MY_PRICE, EST_UNITS).result(), n, repeats)
+                rows.append(
+                    {
+                        "format": fmt,
+                        "rows": n,
+                        "file_mb": path.stat().st_size / 1024 ** 2,
+                        "write_ms": write["median_ms"],
+                        "read_kpis_ms": read["median_ms"],
+                        "total_ms": write["median_ms"] + read["median_ms"],
+                    }
+                )
+                path.unlink(missing_ok=True)
+
+    result = pd.DataFrame(rows)
+    csv_total = result[result["format"] == "csv"].set_index("rows")["total_ms"]
+    result["speedup_vs_csv"] = result["rows"].map(csv_total) / result["total_ms"]
+    return result
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Arrow IPC hand-off between report stages.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_report = sub.add_parser("report", help="KPIs + charts via Arrow hand-off to worker processes")
+    p_report.add_argument("csv", type=Path)
+    p_report.add_argument("--my-price", type=float, default=MY_PRICE)
+    p_report.add_argument("--est-units", type=int, default=EST_UNITS)
+    p_report.add_argument("--out-dir", type=Path, default=Path("."))
+
+    p_bench = sub.add_parser("bench", help="Compare Arrow and CSV hand-off")
+    p_bench.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000])
+    p_bench.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "report":
+        out = run_handoff_report(pd.read_csv(args.csv), args.my_price, args.est_units, args.out_dir)
+        print(pd.Series(out["results"]["kpis"]).round(2).to_string())
+        for name, path in out["charts"].items():
+            print(f"{name}: {path or 'skipped (not enough data)'}")
+    else:
+        print(benchmark_handoff(args.scales, args.repeats).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
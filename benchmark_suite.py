@@ -0,0 +1,260 @@
+# benchmark_suite.py
+#
+# 1. Generates synthetic markets at several scales (see synthetic_market.py)
+# 2. Measures latency, throughput and peak memory of the parser, KPIs,
+#    advanced tables, every chart function and the CSV / Arrow hand-off
+#    between report stages
+# 3. Saves results as JSON and compares them with a previous run to catch regressions
+#
+# Usage:
+#   python benchmark_suite.py                         # run + compare with latest saved run
+#   python benchmark_suite.py --scales 100 1000       # custom scales
+#   python benchmark_suite.py --compare benchmark_results/20260101-120000.json
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import matplotlib
+
+matplotlib.use("Agg")  # no GUI windows while benchmarking
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import advanced_analytics as adv
+import analyze_kpis_and_charts as akc
+import arrow_handoff
+from build_dataset_from_html import parse_storage_cards_from_html
+from synthetic_market import generate_market_listings, generate_unit_listings, render_search_page
+
+RESULTS_DIR = Path("benchmark_results")
+
+SCALES = [100, 1_000, 10_000]
+CHART_SCALES = [100, 1_000]     # charts draw one artist per facility – keep them smaller
+N_MARKETS = 4
+REPEATS = 5
+REGRESSION_THRESHOLD = 1.25     # flag if median latency grows by more than 25%
+
+MY_PRICE = 60.0
+EST_UNITS = 20
+
+
+# -------------------------------------------------------------------
+# MEASUREMENT
+# -------------------------------------------------------------------
+
+def measure(fn: Callable[[], object], n_rows: int, repeats: int = REPEATS) -> Dict:
+    """Time fn() `repeats` times, then run it once more under tracemalloc for peak memory."""
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median_s = statistics.median(timings)
+    return {
+        "rows": n_rows,
+        "median_ms": median_s * 1000,
+        "min_ms": min(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "rows_per_s": n_rows / median_s if median_s > 0 else None,
+        "peak_mem_mb": peak / (1024 * 1024),
+    }
+
+
+def _fig_case(fig_fn: Callable[[], object]) -> Callable[[], None]:
+    """Render a figure-returning chart and close it so figures do not pile up."""
+    def run():
+        fig = fig_fn()
+        fig.canvas.draw()
+        plt.close(fig)
+    return run
+
+
+def _saved_chart_case(chart_fn: Callable[[Path], None], out_dir: Path, name: str) -> Callable[[], None]:
+    """Run a chart that saves itself to disk, silencing its progress print."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            chart_fn(out_dir / f"{name}.png")
+    return run
+
+
+def _handoff_case(write: Callable[[Path], object], read: Callable[[Path], pd.DataFrame],
+                  path: Path) -> Callable[[], None]:
+    """Producer writes the listings, consumer reads them back and computes KPIs."""
+    def run():
+        write(path)
+        akc.compute_market_kpis(read(path), MY_PRICE, est_units=EST_UNITS)
+    return run
+
+
+def build_cases(df: pd.DataFrame, html: str, out_dir: Path, include_charts: bool) -> Dict[str, Callable]:
+    """Return {case_name: zero-arg callable} for one synthetic dataset."""
+    kpis = akc.compute_market_kpis(df, MY_PRICE, est_units=EST_UNITS)
+
+    cases = {
+        "parse_storage_cards_from_html": lambda: parse_storage_cards_from_html(html),
+        "compute_market_kpis": lambda: akc.compute_market_kpis(df, MY_PRICE, est_units=EST_UNITS),
+        "build_scenario_table": lambda: adv.build_scenario_table(kpis, MY_PRICE, EST_UNITS),
+        "build_promo_roi_table": lambda: adv.build_promo_roi_table(kpis, MY_PRICE, EST_UNITS),
+        "handoff_csv": _handoff_case(
+            lambda p: df.to_csv(p, index=False), pd.read_csv, out_dir / "handoff.csv"),
+    }
+    if arrow_handoff.pa is not None:
+        # Arrow buffers come from its own allocator / the mapping, so peak_mem_mb
+        # only shows the Python-side allocations for this case
+        cases["handoff_arrow"] = _handoff_case(
+            lambda p: arrow_handoff.write_listings(df, p), arrow_handoff.read_listings, out_dir / "handoff.arrow")
+    if not include_charts:
+        return cases
+
+    cases.update(
+        {
+            "price_comparison_fig": _fig_case(lambda: akc.price_comparison_fig(df, MY_PRICE)),
+            "price_histogram_fig": _fig_case(lambda: akc.price_histogram_fig(df)),
+            "price_vs_distance_fig": _fig_case(lambda: akc.price_vs_distance_fig(df, MY_PRICE)),
+            "rating_vs_price_fig": _fig_case(lambda: akc.rating_vs_price_fig(df, MY_PRICE)),
+            "promo_pressure_fig": _fig_case(lambda: akc.promo_pressure_fig(df)),
+            "revenue_uplift_fig": _fig_case(lambda: akc.revenue_uplift_fig(MY_PRICE, kpis, EST_UNITS)),
+            "opportunity_quadrant_fig": _fig_case(lambda: akc.opportunity_quadrant_fig(df, MY_PRICE)),
+            "rating_promo_matrix_fig": _fig_case(lambda: akc.rating_promo_matrix_fig(df)),
+            "top_underpriced_chart": _saved_chart_case(
+                lambda p: adv.top_underpriced_chart(df, p), out_dir, "top_underpriced"),
+            "discount_dependence_chart": _saved_chart_case(
+                lambda p: adv.discount_dependence_chart(df, p), out_dir, "discount_dependence"),
+            "price_rating_opportunity_chart": _saved_chart_case(
+                lambda p: adv.price_rating_opportunity_chart(df, p), out_dir, "price_rating_opportunity"),
+            "neighborhood_heatmap": _saved_chart_case(
+                lambda p: adv.neighborhood_heatmap(df, p), out_dir, "neighborhood_heatmap"),
+            "price_band_share_chart": _saved_chart_case(
+                lambda p: adv.price_band_share_chart(df, p), out_dir, "price_band_share"),
+            "trend_over_time_chart": _saved_chart_case(
+                lambda p: adv.trend_over_time_chart(df, MY_PRICE, p), out_dir, "market_trend"),
+        }
+    )
+    return cases
+
+
+def run_suite(scales: List[int], chart_scales: List[int], repeats: int = REPEATS) -> Dict:
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        for n in sorted(set(scales) | set(chart_scales)):
+            df = generate_market_listings(n, N_MARKETS)
+            # Give the trend chart something to draw: spread rows over a few scrape dates
+            df["scrape_date"] = pd.to_datetime("2026-01-01") + pd.to_timedelta(df.index % 4 * 7, unit="D")
+            # Include per-unit tables so the parser's unit-row path is measured too
+            html = render_search_page(df, generate_unit_listings(df))
+
+            cases = build_cases(df, html, out_dir, include_charts=n in chart_scales)
+            for name, fn in cases.items():
+                if n not in scales and not name.endswith(("_fig", "_chart", "_heatmap")):
+                    continue
+                res = measure(fn, n, repeats=repeats)
+                res["case"] = name
+                results.append(res)
+                print(
+                    f"{name:<32} n={n:>7,}  {res['median_ms']:>10.2f} ms  "
+                    f"{res['peak_mem_mb']:>8.2f} MB"
+                )
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+# -------------------------------------------------------------------
+# RESULTS + REGRESSION CHECK
+# -------------------------------------------------------------------
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def save_results(run: Dict, results_dir: Path = RESULTS_DIR) -> Path:
+    results_dir.mkdir(parents=True, exist_ok=True)
+    path = results_dir / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+    return path
+
+
+def latest_results(results_dir: Path = RESULTS_DIR, exclude: Optional[Path] = None) -> Optional[Path]:
+    runs = sorted(p for p in results_dir.glob("*.json") if p != exclude)
+    return runs[-1] if runs else None
+
+
+def compare_runs(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """Join two runs on (case, rows) and flag cases whose median latency grew past threshold."""
+    cols = ["case", "rows", "median_ms", "peak_mem_mb"]
+    base = pd.DataFrame(baseline["results"])[cols]
+    cur = pd.DataFrame(current["results"])[cols]
+
+    merged = cur.merge(base, on=["case", "rows"], suffixes=("", "_baseline"))
+    merged["latency_ratio"] = merged["median_ms"] / merged["median_ms_baseline"]
+    merged["memory_ratio"] = merged["peak_mem_mb"] / merged["peak_mem_mb_baseline"]
+    merged["regression"] = merged["latency_ratio"] > threshold
+    return merged.sort_values("latency_ratio", ascending=False)
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser, KPIs, tables and charts.")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--chart-scales", type=int, nargs="+", default=CHART_SCALES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON (default: latest saved run)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    run = run_suite(args.scales, args.chart_scales, repeats=args.repeats)
+    path = save_results(run)
+    print(f"\nSaved benchmark results to: {path.resolve()}")
+
+    baseline_path = args.compare or latest_results(exclude=path)
+    if baseline_path is None:
+        print("No previous run to compare against.")
+        return
+
+    cmp = compare_runs(json.loads(baseline_path.read_text(encoding="utf-8")), run, args.threshold)
+    print(f"\n=== Compared with {baseline_path.name} ===")
+    print(cmp[["case", "rows", "median_ms_baseline", "median_ms", "latency_ratio", "memory_ratio"]]
+          .to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    regressions = cmp[cmp["regression"]]
+    if not regressions.empty:
+        print(f"\n{len(regressions)} case(s) slower than {args.threshold:.2f}x baseline.")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,98 @@
 #
 # 1. Loads a saved Storage.com search results page (HTML file)
 # 2. Extracts facility data (name, address, prices, rating, distance, promo)
-# 3. Saves the result as a CSV for KPI analysis and visualization
+#    and, in the same pass, the per-unit-size price / promo table of each card
+# 3. Saves the results as CSVs for KPI analysis and visualization
 
 import json
+import re
 from pathlib import Path
+from typing import Optional, Tuple
 
 import pandas as pd
 from bs4 import BeautifulSoup
 
+from pipeline_profiler import run_profiled, stage
+
 HTML_PATH = Path("www.storage.com.html")        # put the file in same folder as this script
 OUTPUT_CSV = Path("storage_market_indianapolis.csv")
+OUTPUT_UNITS_CSV = Path("storage_market_indianapolis_units.csv")
+
+# Per-unit rows inside a facility card
+UNIT_ROW_SELECTOR = "div.unit-row"
+UNIT_SIZE_SELECTOR = "span.unit-size"
+UNIT_PRICE_SELECTOR = "span.unit-price"
+UNIT_ORIGINAL_PRICE_SELECTOR = "span.unit-original-price"
+UNIT_PROMO_SELECTOR = "span.unit-promo"
+
+UNIT_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*'?\s*[xX×]\s*(\d+(?:\.\d+)?)")
+
+
+def normalize_unit_size(text: Optional[str]) -> Optional[str]:
+    """"10' x 10'" / "10 X 10" / "10×10" -> "10x10" (None if no size found)."""
+    if not text:
+        return None
+    match = UNIT_SIZE_RE.search(text)
+    if not match:
+        return None
+    width, length = (f"{float(v):g}" for v in match.groups())
+    return f"{width}x{length}"
+
+
+def _parse_price(tag) -> Optional[float]:
+    if tag is None:
+        return None
+    try:
+        return float(tag.get_text(strip=True).replace("$", "").replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _parse_unit_rows(card) -> list:
+    """Per-unit-size prices and promos inside one facility card."""
+    units = []
+    for unit in card.select(UNIT_ROW_SELECTOR):
+        size_tag = unit.select_one(UNIT_SIZE_SELECTOR)
+        unit_size = normalize_unit_size(size_tag.get_text(" ", strip=True) if size_tag else None)
+        if unit_size is None:
+            continue
+
+        price = _parse_price(unit.select_one(UNIT_PRICE_SELECTOR))
+        original = _parse_price(unit.select_one(UNIT_ORIGINAL_PRICE_SELECTOR))
+        promo_tag = unit.select_one(UNIT_PROMO_SELECTOR)
+        promo_text = promo_tag.get_text(" ", strip=True) if promo_tag else None
+
+        units.append(
+            {
+                "unit_size": unit_size,
+                "lowest_price": price,
+                "starting_price": original,
+                # Same promo rule as the card: a crossed-out price above the current one
+                "promo_flag": price is not None and original is not None and price < original,
+                "promo_text": promo_text,
+            }
+        )
+    return units
 
 
 def parse_storage_cards_from_html(html: str) -> pd.DataFrame:
     """Parse all <div class="facility-card"> blocks on a Storage.com search page."""
+    return parse_storage_page(html)[0]
+
+
+def parse_storage_page(html: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Parse a Storage.com search page in one pass. Returns:
+      - facilities: one row per facility card (card-level lowest / starting price)
+      - units: long format, one row per facility x unit size, with the facility
+        columns repeated and lowest_price / starting_price / promo_flag taken
+        from that unit size – so it feeds compute_market_kpis directly
+    """
     soup = BeautifulSoup(html, "html.parser")
 
     cards = soup.select("div.facility-card")
     rows = []
+    unit_rows = []
 
     for card in cards:
         # 1) Structured JSON inside each card
@@ -119,22 +193,42 @@ def parse_storage_cards_from_html(html: str) -> pd.DataFrame:
             }
         )
 
-    return pd.DataFrame(rows)
+        for unit in _parse_unit_rows(card):
+            unit_rows.append({**rows[-1], **unit})
+
+    return pd.DataFrame(rows), pd.DataFrame(unit_rows)
+
+
+def facility_keys(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable per-facility key for joining scrapes: the facility URL when present,
+    otherwise "name|zip".
+    """
+    fallback = df["facility_name"].fillna("").astype(str) + "|" + df["zip_code"].fillna("").astype(str)
+    return df["relative_url"].where(df["relative_url"].notna(), fallback).astype(str)
 
 
 def main():
     if not HTML_PATH.exists():
         raise FileNotFoundError(f"HTML file not found: {HTML_PATH.resolve()}")
 
-    html = HTML_PATH.read_text(encoding="utf-8", errors="ignore")
-    df = parse_storage_cards_from_html(html)
+    with stage("read_html") as s:
+        html = HTML_PATH.read_text(encoding="utf-8", errors="ignore")
+        s.set(bytes=len(html))
+
+    with stage("parse") as s:
+        df, df_units = parse_storage_page(html)
+        s.set(rows=len(df), unit_rows=len(df_units))
 
-    print(f"Parsed {len(df)} facilities from Storage.com")
+    print(f"Parsed {len(df)} facilities ({len(df_units)} unit-size prices) from Storage.com")
     print(df.head())
 
-    df.to_csv(OUTPUT_CSV, index=False)
+    with stage("write_csv", rows=len(df) + len(df_units)):
+        df.to_csv(OUTPUT_CSV, index=False)
+        df_units.to_csv(OUTPUT_UNITS_CSV, index=False)
     print(f"\nSaved dataset to: {OUTPUT_CSV.resolve()}")
+    print(f"Saved unit-size dataset to: {OUTPUT_UNITS_CSV.resolve()}")
 
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main, "build_dataset")
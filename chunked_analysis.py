@@ -0,0 +1,264 @@
+# chunked_analysis.py
+#
+# Out-of-core KPIs and chart inputs for listing files too large to load at once.
+#
+# 1. Reads the CSV in fixed-size chunks (only the columns the report needs);
+#    the chunk size is derived from a memory budget
+# 2. Folds each chunk into a compact count table keyed by
+#    (lowest_price, promo_flag, distance band) plus rating-bucket promo counts.
+#    Prices are discrete, so the table stays small however many rows stream past
+# 3. Finalises the same KPIs as kpis.compute_market_kpis and the same inputs as
+#    the price histogram, promo pressure, price band share, rating/promo and
+#    neighbourhood heatmap charts – exactly, including the price quantiles
+#
+# Usage:
+#   python chunked_analysis.py nationwide_listings.csv --memory-mb 256 --out-dir charts
+#   python chunked_analysis.py nationwide_listings.csv --check   # compare with in-memory
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import advanced_analytics as adv
+import analyze_kpis_and_charts as akc
+import kpis as k
+from pipeline_profiler import run_profiled, stage
+
+MEMORY_BUDGET_MB = 256
+SAMPLE_ROWS = 2_000
+PARSE_OVERHEAD = 2       # read_csv peaks at roughly twice the raw + parsed chunk size
+MIN_CHUNK_ROWS = 1_000
+
+COLUMNS = ["lowest_price", "promo_flag", "distance_miles", "rating"]
+NO_DISTANCE = ""         # distance band key for rows without distance_miles
+
+
+def chunk_rows_for_budget(csv_path: Path, memory_budget_mb: float = MEMORY_BUDGET_MB) -> int:
+    """
+    Rows per chunk that keep one chunk within the budget. The tokenizer holds the
+    raw text of every column, so the estimate counts raw line bytes as well as
+    the parsed columns.
+    """
+    with open(csv_path, "rb") as fh:
+        lines = [line for _, line in zip(range(SAMPLE_ROWS + 1), fh)][1:]
+    raw_per_row = sum(map(len, lines)) / max(len(lines), 1)
+
+    sample = pd.read_csv(csv_path, usecols=lambda c: c in COLUMNS, nrows=SAMPLE_ROWS)
+    parsed_per_row = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+
+    bytes_per_row = max((raw_per_row + parsed_per_row) * PARSE_OVERHEAD, 1.0)
+    return max(int(memory_budget_mb * 1024 ** 2 / bytes_per_row), MIN_CHUNK_ROWS)
+
+
+def iter_listing_chunks(csv_path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    for chunk in pd.read_csv(csv_path, usecols=lambda c: c in COLUMNS, chunksize=chunksize):
+        yield chunk.reindex(columns=COLUMNS)
+
+
+# -------------------------------------------------------------------
+# PARTIAL RESULTS
+# -------------------------------------------------------------------
+
+def chunk_partials(chunk: pd.DataFrame) -> Dict:
+    """Aggregate one chunk into mergeable counts."""
+    # 1.0 / 0.0 / NaN: missing flags are kept so finalise() treats them exactly
+    # like kpis.promo_pressure (skipped) and kpis.demand_signal (counted as promo)
+    promo = pd.Series(
+        chunk["promo_flag"].astype("boolean").to_numpy(float, na_value=np.nan), index=chunk.index
+    )
+
+    priced = chunk.dropna(subset=["lowest_price"])
+    has_distance = priced["distance_miles"].notna()
+    dist_band = adv.distance_band(priced["distance_miles"]).where(has_distance, NO_DISTANCE)
+    price_counts = (
+        pd.DataFrame({"lowest_price": priced["lowest_price"], "promo_flag": promo[priced.index],
+                      "dist_band": dist_band})
+        .value_counts(dropna=False)
+    )
+
+    rated = chunk.dropna(subset=["rating"])
+    rating_counts = promo[rated.index].groupby(akc.rating_bucket(rated["rating"])).agg(["sum", "count"])
+
+    return {
+        "n_rows": len(chunk),
+        "promo_rows": int(promo.sum()),      # NaN skipped
+        "promo_na": int(chunk["promo_flag"].isna().sum()),
+        "price_counts": price_counts,
+        "rating_counts": rating_counts,
+    }
+
+
+def merge_partials(a: Optional[Dict], b: Dict) -> Dict:
+    if a is None:
+        return b
+    return {
+        "n_rows": a["n_rows"] + b["n_rows"],
+        "promo_rows": a["promo_rows"] + b["promo_rows"],
+        "promo_na": a["promo_na"] + b["promo_na"],
+        "price_counts": a["price_counts"].add(b["price_counts"], fill_value=0).astype(np.int64),
+        "rating_counts": a["rating_counts"].add(b["rating_counts"], fill_value=0).astype(np.int64),
+    }
+
+
+# -------------------------------------------------------------------
+# FINALISE
+# -------------------------------------------------------------------
+
+def _quantile(values: np.ndarray, counts: np.ndarray, q: float) -> float:
+    """pandas' default (linear) quantile of a sorted value / count table."""
+    cum = np.cumsum(counts)
+    pos = q * (cum[-1] - 1)
+    lo, frac = int(np.floor(pos)), pos - np.floor(pos)
+    v_lo = values[np.searchsorted(cum, lo, side="right")]
+    v_hi = values[np.searchsorted(cum, lo + 1, side="right")] if frac else v_lo
+    return v_lo + (v_hi - v_lo) * frac
+
+
+def finalise(partials: Dict, my_price: float, est_units: int) -> Dict:
+    """KPIs (same dict as compute_market_kpis) and chart inputs from merged partials."""
+    table = partials["price_counts"].rename("n").reset_index()
+    n = table["n"].to_numpy()
+    price = table["lowest_price"].to_numpy(float)
+    promo = table["promo_flag"].to_numpy(float)
+    n_priced = n.sum()
+    n_flagged = n[~np.isnan(promo)].sum()
+
+    avg = (price * n).sum() / n_priced
+    gap = k.price_gap(avg, my_price)
+    rec_price = k.recommended_price(my_price, avg)
+    extra = k.extra_per_unit(rec_price, my_price)
+    demand = k.demand_signal(table, avg).to_numpy()
+
+    kpis = {
+        "market_avg": avg,
+        "market_min": price.min(),
+        "market_max": price.max(),
+        "price_gap": gap,
+        "price_gap_pct": k.price_gap_pct(gap, avg),
+        "promo_pressure": n[promo == 1].sum() / n_flagged * 100 if n_flagged else np.nan,
+        "occ_index": (demand * n).sum() / n_priced * 100,
+        "recommended_price": rec_price,
+        "annual_uplift": k.annual_uplift(extra, est_units),
+        "extra_per_unit": extra,
+    }
+
+    by_price = table.groupby("lowest_price")["n"].sum()
+    hist_counts, edges = np.histogram(by_price.index.to_numpy(float), bins=10, weights=by_price.to_numpy())
+
+    bands = adv.price_position_band(table["lowest_price"], avg)
+    band_shares = (table["n"].groupby(bands).sum() / n_priced * 100).sort_values(ascending=False)
+
+    # Heatmap uses listings with a distance; its quantiles / average are over those only
+    near = table[table["dist_band"] != NO_DISTANCE]
+    pivot = pd.DataFrame()
+    if not near.empty:
+        near_price = near.groupby("lowest_price")["n"].sum()
+        q1 = _quantile(near_price.index.to_numpy(float), near_price.to_numpy(), 0.33)
+        q2 = _quantile(near_price.index.to_numpy(float), near_price.to_numpy(), 0.66)
+        near_avg = (near["lowest_price"] * near["n"]).sum() / near["n"].sum()
+        cells = pd.DataFrame(
+            {
+                "dist_band": near["dist_band"],
+                "price_band": adv.price_tier(near["lowest_price"], q1, q2),
+                "weighted": k.demand_signal(near, near_avg) * near["n"],
+                "n": near["n"],
+            }
+        ).groupby(["dist_band", "price_band"])[["weighted", "n"]].sum()
+        pivot = (cells["weighted"] / cells["n"]).unstack("price_band")
+        pivot.columns.name, pivot.index.name = "price_band", "dist_band"
+
+    rating = partials["rating_counts"]
+    valid_promo = partials["n_rows"] - partials["promo_na"]
+    return {
+        "n_rows": partials["n_rows"],
+        "kpis": kpis,
+        "price_histogram": (hist_counts, edges),
+        # promo_pressure_fig takes the mean over all rows with a promo_flag
+        "promo_share": partials["promo_rows"] / valid_promo if valid_promo else np.nan,
+        "price_band_shares": band_shares.rename("proportion"),
+        "rating_promo_shares": (rating["sum"] / rating["count"] * 100).rename("promo_flag"),
+        "neighborhood_pivot": pivot,
+    }
+
+
+def analyze_in_chunks(
+    csv_path: Path,
+    my_price: float,
+    est_units: int = 20,
+    memory_budget_mb: float = MEMORY_BUDGET_MB,
+    chunksize: Optional[int] = None,
+) -> Dict:
+    """Stream a listings CSV and return KPIs plus chart inputs (see finalise)."""
+    chunksize = chunksize or chunk_rows_for_budget(csv_path, memory_budget_mb)
+    partials = None
+    for chunk in iter_listing_chunks(csv_path, chunksize):
+        with stage("chunk", rows=len(chunk)):
+            partials = merge_partials(partials, chunk_partials(chunk))
+    if partials is None or partials["price_counts"].empty:
+        raise ValueError(f"No priced listings in {csv_path}")
+
+    with stage("finalise"):
+        return finalise(partials, my_price, est_units)
+
+
+def render_charts(results: Dict, out_dir: Path, my_price: float, est_units: int):
+    """Save the charts that can be drawn from the streamed aggregates."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    figs = {
+        "price_histogram": akc.price_histogram_counts_fig(*results["price_histogram"]),
+        "promo_pressure": akc.promo_share_fig(results["promo_share"]),
+        "revenue_uplift": akc.revenue_uplift_fig(my_price, results["kpis"], est_units),
+        "rating_promo_matrix": akc.rating_promo_shares_fig(results["rating_promo_shares"]),
+    }
+    for name, fig in figs.items():
+        with stage(f"chart:{name}"):
+            fig.savefig(out_dir / f"{name}.png", dpi=150, bbox_inches="tight")
+            plt.close(fig)
+
+    with stage("chart:price_band_share"):
+        adv.draw_price_band_share(results["price_band_shares"], out_dir / "price_band_share.png")
+    with stage("chart:neighborhood_heatmap"):
+        adv.draw_neighborhood_heatmap(results["neighborhood_pivot"], out_dir / "neighborhood_heatmap.png")
+
+
+def compare_with_in_memory(results: Dict, csv_path: Path, my_price: float, est_units: int) -> pd.DataFrame:
+    """Load the file fully and report every KPI side by side with the streamed result."""
+    df = pd.read_csv(csv_path)
+    expected = k.compute_market_kpis(df, my_price, est_units)
+    report = pd.DataFrame({"in_memory": pd.Series(expected), "chunked": pd.Series(results["kpis"])})
+    report["match"] = np.isclose(report["in_memory"], report["chunked"])
+    return report
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core market KPIs and charts.")
+    parser.add_argument("csv", type=Path)
+    parser.add_argument("--my-price", type=float, default=akc.MY_PRICE)
+    parser.add_argument("--est-units", type=int, default=akc.EST_UNITS)
+    parser.add_argument("--memory-mb", type=float, default=MEMORY_BUDGET_MB)
+    parser.add_argument("--chunksize", type=int, help="Rows per chunk (overrides --memory-mb)")
+    parser.add_argument("--out-dir", type=Path, default=Path("."))
+    parser.add_argument("--check", action="store_true", help="Also load in memory and compare KPIs")
+    args = parser.parse_args()
+
+    results = analyze_in_chunks(args.csv, args.my_price, args.est_units, args.memory_mb, args.chunksize)
+    print(f"Streamed {results['n_rows']} listings from {args.csv.name}")
+    print(pd.Series(results["kpis"]).round(2).to_string())
+    render_charts(results, args.out_dir, args.my_price, args.est_units)
+
+    if args.check:
+        print(compare_with_in_memory(results, args.csv, args.my_price, args.est_units).to_string())
+
+
+if __name__ == "__main__":
+    run_profiled(main, "chunked_analysis")
@@ -0,0 +1,201 @@
+# geo_tiles.py
+#
+# Geo-tile pre-aggregation for metro / state-wide demand heatmaps.
+#
+# neighborhood_heatmap() buckets competitors by distance from one search
+# centre. Here listings are binned into Web Mercator map tiles (the z/x/y
+# scheme used by web maps) from their latitude / longitude:
+#
+# 1. Aggregate once at the finest zoom: count, price sum / sum of squares /
+#    min / max, promo count and demand-signal sum per tile
+# 2. Roll up to coarser zooms by merging children into parents (x // 2, y // 2),
+#    so every level is exact without touching raw rows again
+# 3. Render a heatmap for any zoom and area straight from the tile table
+#
+# Zoom guide: 8 ≈ state (~120 km tiles), 10 ≈ metro (~30 km), 12 ≈ city (~8 km),
+# 14 ≈ neighbourhood (~2 km).
+#
+# Usage:
+#   python geo_tiles.py build storage_market_indianapolis.csv --output geo_tiles.csv
+#   python geo_tiles.py heatmap geo_tiles.csv --zoom 12 --value demand_index
+
+import argparse
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from kpis import demand_signal
+
+ZOOMS = (8, 10, 12, 14)
+CITY_ZOOM = 12     # default heatmap level (see zoom guide above)
+OUTPUT_CSV = Path("geo_tiles.csv")
+
+TILE_KEYS = ["zoom", "tile_x", "tile_y"]
+SUM_COLUMNS = ["n_listings", "price_sum", "price_sq_sum", "promo_count", "demand_sum"]
+
+
+def lonlat_to_tile(lon: np.ndarray, lat: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator tile indices for arrays of coordinates."""
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    x = ((lon + 180.0) / 360.0 * n).astype(np.int64)
+    y = ((1.0 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2.0 * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+def tile_to_lonlat(x: np.ndarray, y: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """North-west corner of tiles (use x + 1, y + 1 for the south-east corner)."""
+    n = 2 ** zoom
+    lon = x / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / n))))
+    return lon, lat
+
+
+def _with_demand(df: pd.DataFrame) -> pd.DataFrame:
+    """Priced, geocoded rows with demand_signal against their own market's average."""
+    rows = df.dropna(subset=["lowest_price", "latitude", "longitude"]).copy()
+    if "market" in rows.columns and not rows.empty:
+        rows["demand_signal"] = pd.concat(
+            demand_signal(group, group["lowest_price"].mean()) for _, group in rows.groupby("market")
+        )
+    else:
+        rows["demand_signal"] = demand_signal(rows, rows["lowest_price"].mean())
+    return rows
+
+
+def _merge_tiles(tiles: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Merge tiles that share keys: sums add up, min / max combine."""
+    return tiles.groupby(keys, as_index=False).agg(
+        {**{c: "sum" for c in SUM_COLUMNS}, "price_min": "min", "price_max": "max"}
+    )
+
+
+def build_tile_aggregates(df: pd.DataFrame, zooms: Iterable[int] = ZOOMS) -> pd.DataFrame:
+    """Per-tile stats at every zoom level, rolled up from the finest one."""
+    zooms = sorted(set(zooms), reverse=True)
+    rows = _with_demand(df)
+
+    x, y = lonlat_to_tile(rows["longitude"].to_numpy(float), rows["latitude"].to_numpy(float), zooms[0])
+    price = rows["lowest_price"].to_numpy(float)
+    level = _merge_tiles(
+        pd.DataFrame(
+            {
+                "tile_x": x,
+                "tile_y": y,
+                "n_listings": 1,
+                "price_sum": price,
+                "price_sq_sum": price ** 2,
+                "price_min": price,
+                "price_max": price,
+                "promo_count": rows["promo_flag"].astype(bool).astype(int).to_numpy(),
+                "demand_sum": rows["demand_signal"].to_numpy(float),
+            }
+        ),
+        ["tile_x", "tile_y"],
+    )
+
+    levels = [level.assign(zoom=zooms[0])]
+    for finer, zoom in zip(zooms, zooms[1:]):
+        shift = finer - zoom
+        level = _merge_tiles(
+            level.assign(tile_x=level["tile_x"] // 2 ** shift, tile_y=level["tile_y"] // 2 ** shift),
+            ["tile_x", "tile_y"],
+        )
+        levels.append(level.assign(zoom=zoom))
+
+    tiles = pd.concat(levels, ignore_index=True)
+    return add_tile_stats(tiles[TILE_KEYS + SUM_COLUMNS + ["price_min", "price_max"]])
+
+
+def add_tile_stats(tiles: pd.DataFrame) -> pd.DataFrame:
+    """Derived per-tile metrics from the additive sums."""
+    n = tiles["n_listings"]
+    mean = tiles["price_sum"] / n
+    return tiles.assign(
+        price_mean=mean,
+        price_std=np.sqrt(np.maximum(tiles["price_sq_sum"] / n - mean ** 2, 0.0)),
+        promo_share=tiles["promo_count"] / n * 100,
+        demand_index=tiles["demand_sum"] / n * 100,
+    )
+
+
+def merge_tile_aggregates(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Combine two tile tables (e.g. a new scrape into the existing one)."""
+    return add_tile_stats(_merge_tiles(pd.concat([a, b], ignore_index=True), TILE_KEYS))
+
+
+def tile_heatmap(
+    tiles: pd.DataFrame,
+    zoom: int,
+    output_path: Path,
+    value: str = "demand_index",
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+):
+    """
+    Heatmap of one metric at one zoom level, drawn from tile aggregates only.
+    bbox = (min_lon, min_lat, max_lon, max_lat) limits the area.
+    """
+    level = tiles[tiles["zoom"] == zoom]
+    if bbox is not None:
+        x0, y1 = lonlat_to_tile(np.array([bbox[0]]), np.array([bbox[1]]), zoom)
+        x1, y0 = lonlat_to_tile(np.array([bbox[2]]), np.array([bbox[3]]), zoom)
+        level = level[level["tile_x"].between(x0[0], x1[0]) & level["tile_y"].between(y0[0], y1[0])]
+    if level.empty:
+        print(f"No tiles at zoom {zoom} for heatmap.")
+        return
+
+    xmin, xmax = level["tile_x"].min(), level["tile_x"].max()
+    ymin, ymax = level["tile_y"].min(), level["tile_y"].max()
+    grid = np.full((ymax - ymin + 1, xmax - xmin + 1), np.nan)
+    grid[level["tile_y"] - ymin, level["tile_x"] - xmin] = level[value]
+
+    lon0, lat0 = tile_to_lonlat(xmin, ymin, zoom)
+    lon1, lat1 = tile_to_lonlat(xmax + 1, ymax + 1, zoom)
+
+    fig, ax = plt.subplots(figsize=(6, 5))
+    im = ax.imshow(np.ma.masked_invalid(grid), extent=(lon0, lon1, lat1, lat0), aspect="auto")
+    fig.colorbar(im, ax=ax, label=value.replace("_", " "))
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+    ax.set_title(f"Competitor {value.replace('_', ' ')} by map tile (zoom {zoom})")
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+    print(f"Saved tile heatmap to: {Path(output_path).resolve()}")
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Geo-tile aggregates and heatmaps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Aggregate a listings CSV into tiles")
+    p_build.add_argument("csv", type=Path)
+    p_build.add_argument("--zooms", type=int, nargs="+", default=list(ZOOMS))
+    p_build.add_argument("--output", type=Path, default=OUTPUT_CSV)
+
+    p_map = sub.add_parser("heatmap", help="Render a heatmap from a tile CSV")
+    p_map.add_argument("tiles_csv", type=Path)
+    p_map.add_argument("--zoom", type=int, default=CITY_ZOOM)
+    p_map.add_argument("--value", default="demand_index",
+                       choices=["demand_index", "price_mean", "price_std", "promo_share", "n_listings"])
+    p_map.add_argument("--output", type=Path, default=Path("tile_heatmap.png"))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        tiles = build_tile_aggregates(pd.read_csv(args.csv), args.zooms)
+        tiles.to_csv(args.output, index=False)
+        print(tiles.groupby("zoom").size().rename("tiles").to_string())
+        print(f"Saved tile aggregates to: {args.output.resolve()}")
+    else:
+        tile_heatmap(pd.read_csv(args.tiles_csv), args.zoom, args.output, args.value)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+# html_archive.py
+#
+# Compressed, randomly accessible archive of raw Storage.com result pages.
+#
+# 1. Stores each page keyed by (market, scrape_date, page) in an append-only
+#    segment file per market; a SQLite index records offset / length
+# 2. Compresses with a dictionary trained on earlier pages (result pages share
+#    most of their markup, so a dictionary shrinks each page far more than
+#    compressing it alone). Uses zstandard when installed, otherwise stdlib zlib
+#    with a preset dictionary
+# 3. Reading one page is a single seek + read + decompress
+# 4. reparse_archive() re-runs the parser over history in parallel processes,
+#    e.g. after a parser fix
+#
+# Usage:
+#   python html_archive.py add www.storage.com.html --market indianapolis --date 2026-10-01
+#   python html_archive.py train
+#   python html_archive.py reparse --output reparsed_listings.csv
+
+import argparse
+import os
+import sqlite3
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from build_dataset_from_html import parse_storage_page
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = Path("html_archive")
+DICT_SIZE = 32 * 1024          # zlib's preset dictionary window is 32 KiB
+TRAIN_SAMPLES = 200
+ZSTD_LEVEL = 19
+ZLIB_LEVEL = 9
+
+
+# -------------------------------------------------------------------
+# DICTIONARY CODECS
+# -------------------------------------------------------------------
+
+def _train_zlib_dictionary(samples: List[bytes], dict_size: int = DICT_SIZE) -> bytes:
+    """
+    Build a zlib preset dictionary from the markup fragments that repeat across
+    pages. zlib matches best against the end of the dictionary, so the most
+    common fragments go last.
+    """
+    counts = Counter()
+    for sample in samples:
+        # Count each fragment once per page: we want shared markup, not repetition within a page
+        counts.update(set(frag + b">" for frag in sample.split(b">") if 8 <= len(frag) <= 512))
+
+    picked, size = [], 0
+    for frag, n in counts.most_common():
+        if n < 2 or size + len(frag) > dict_size:
+            continue
+        picked.append(frag)
+        size += len(frag)
+    return b"".join(reversed(picked))
+
+
+def train_dictionary(samples: List[bytes], codec: str, dict_size: int = DICT_SIZE) -> bytes:
+    if codec == "zstd":
+        return zstandard.train_dictionary(dict_size, samples).as_bytes()
+    return _train_zlib_dictionary(samples, dict_size)
+
+
+def compress(data: bytes, codec: str, dictionary: Optional[bytes]) -> bytes:
+    if codec == "zstd":
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(data)
+    comp = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(ZLIB_LEVEL)
+    return comp.compress(data) + comp.flush()
+
+
+def decompress(blob: bytes, codec: str, dictionary: Optional[bytes]) -> bytes:
+    if codec == "zstd":
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(blob)
+    decomp = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return decomp.decompress(blob) + decomp.flush()
+
+
+# -------------------------------------------------------------------
+# ARCHIVE
+# -------------------------------------------------------------------
+
+class HtmlArchive:
+    def __init__(self, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+        (self.root / "segments").mkdir(parents=True, exist_ok=True)
+        (self.root / "dicts").mkdir(exist_ok=True)
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        self.conn = sqlite3.connect(self.root / "index.sqlite")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                market TEXT NOT NULL,
+                scrape_date TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                dict_id INTEGER,
+                PRIMARY KEY (market, scrape_date, page)
+            );
+            CREATE TABLE IF NOT EXISTS dictionaries (
+                dict_id INTEGER PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                n_samples INTEGER NOT NULL
+            );
+            """
+        )
+        self._dicts: Dict[int, bytes] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -- dictionaries --------------------------------------------------
+
+    def _dictionary(self, dict_id: Optional[int]) -> Optional[bytes]:
+        if dict_id is None:
+            return None
+        if dict_id not in self._dicts:
+            self._dicts[dict_id] = (self.root / "dicts" / f"{dict_id}.dict").read_bytes()
+        return self._dicts[dict_id]
+
+    def current_dictionary(self) -> Tuple[Optional[int], Optional[bytes]]:
+        row = self.conn.execute(
+            "SELECT MAX(dict_id) FROM dictionaries WHERE codec = ?", (self.codec,)
+        ).fetchone()
+        dict_id = row[0] if row else None
+        return dict_id, self._dictionary(dict_id)
+
+    def train(self, n_samples: int = TRAIN_SAMPLES, dict_size: int = DICT_SIZE) -> Optional[int]:
+        """Train a new dictionary on the most recent archived pages; new pages will use it."""
+        keys = self.conn.execute(
+            "SELECT market, scrape_date, page FROM pages ORDER BY scrape_date DESC LIMIT ?", (n_samples,)
+        ).fetchall()
+        if len(keys) < 2:
+            return None
+
+        samples = [self.get(*key).encode("utf-8") for key in keys]
+        dictionary = train_dictionary(samples, self.codec, dict_size)
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO dictionaries (codec, size, n_samples) VALUES (?, ?, ?)",
+                (self.codec, len(dictionary), len(samples)),
+            )
+        dict_id = cur.lastrowid
+        (self.root / "dicts" / f"{dict_id}.dict").write_bytes(dictionary)
+        self._dicts[dict_id] = dictionary
+        return dict_id
+
+    # -- pages ---------------------------------------------------------
+
+    def put(self, market: str, scrape_date: str, html: str, page: int = 1):
+        """Compress and append one page (replacing any earlier copy in the index)."""
+        raw = html.encode("utf-8")
+        dict_id, dictionary = self.current_dictionary()
+        blob = compress(raw, self.codec, dictionary)
+
+        segment = f"{market}.bin"
+        with open(self.root / "segments" / segment, "ab") as fh:
+            offset = fh.tell()
+            fh.write(blob)
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (market, scrape_date, page, segment, offset, len(blob), len(raw), self.codec, dict_id),
+            )
+
+    def get(self, market: str, scrape_date: str, page: int = 1) -> str:
+        """Random access to one archived page."""
+        row = self.conn.execute(
+            "SELECT segment, offset, length, codec, dict_id FROM pages "
+            "WHERE market = ? AND scrape_date = ? AND page = ?",
+            (market, scrape_date, page),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No archived page for {market} {scrape_date} page {page}")
+
+        segment, offset, length, codec, dict_id = row
+        with open(self.root / "segments" / segment, "rb") as fh:
+            fh.seek(offset)
+            blob = fh.read(length)
+        return decompress(blob, codec, self._dictionary(dict_id)).decode("utf-8")
+
+    def pages(self, market: Optional[str] = None) -> pd.DataFrame:
+        sql = "SELECT market, scrape_date, page, length, raw_size, codec, dict_id FROM pages"
+        params: tuple = ()
+        if market:
+            sql += " WHERE market = ?"
+            params = (market,)
+        return pd.read_sql_query(sql + " ORDER BY market, scrape_date, page", self.conn, params=params)
+
+
+# -------------------------------------------------------------------
+# PARALLEL RE-PARSE
+# -------------------------------------------------------------------
+
+def _reparse_pages(args: Tuple[str, List[Tuple[str, str, int]]]) -> pd.DataFrame:
+    """Worker: open the archive in this process and parse a batch of pages."""
+    root, keys = args
+    frames = []
+    with HtmlArchive(Path(root)) as archive:
+        for market, scrape_date, page in keys:
+            df, _ = parse_storage_page(archive.get(market, scrape_date, page))
+            frames.append(df.assign(market=market, scrape_date=scrape_date, page=page))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def reparse_archive(
+    root: Path = ARCHIVE_DIR, market: Optional[str] = None, workers: Optional[int] = None
+) -> pd.DataFrame:
+    """Parse every archived page (optionally one market) across worker processes."""
+    with HtmlArchive(root) as archive:
+        keys = list(archive.pages(market)[["market", "scrape_date", "page"]].itertuples(index=False, name=None))
+    if not keys:
+        return pd.DataFrame()
+
+    workers = workers or os.cpu_count() or 1
+    batches = [(str(root), keys[i::workers]) for i in range(workers) if keys[i::workers]]
+    with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+        frames = list(pool.map(_reparse_pages, batches))
+    return pd.concat(frames, ignore_index=True)
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw HTML page archive.")
+    parser.add_argument("--root", type=Path, default=ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="Archive a saved results page")
+    p_add.add_argument("html", type=Path)
+    p_add.add_argument("--market", required=True)
+    p_add.add_argument("--date", help="Scrape date (YYYY-MM-DD), default today")
+    p_add.add_argument("--page", type=int, default=1)
+
+    sub.add_parser("train", help="Train a compression dictionary on archived pages")
+    sub.add_parser("stats", help="Show archive size and compression ratio")
+
+    p_reparse = sub.add_parser("reparse", help="Re-run the parser over the archive")
+    p_reparse.add_argument("--market")
+    p_reparse.add_argument("--workers", type=int)
+    p_reparse.add_argument("--output", type=Path, default=Path("reparsed_listings.csv"))
+    args = parser.parse_args()
+
+    if args.command == "reparse":
+        df = reparse_archive(args.root, args.market, args.workers)
+        df.to_csv(args.output, index=False)
+        print(f"Re-parsed {len(df)} listings; saved to {args.output.resolve()}")
+        return
+
+    with HtmlArchive(args.root) as archive:
+        if args.command == "add":
+            html = args.html.read_text(encoding="utf-8", errors="ignore")
+            archive.put(args.market, args.date or date.today().isoformat(), html, args.page)
+            print(f"Archived {args.html} as {args.market} / page {args.page}")
+
+        elif args.command == "train":
+            dict_id = archive.train()
+            print("Need at least 2 archived pages to train." if dict_id is None else f"Trained dictionary {dict_id}")
+
+        else:
+            pages = archive.pages()
+            raw, stored = pages["raw_size"].sum(), pages["length"].sum()
+            print(f"{len(pages)} pages, {raw / 1e6:.1f} MB raw -> {stored / 1e6:.1f} MB stored "
+                  f"({raw / max(stored, 1):.1f}x, codec {archive.codec})")
+
+
+if __name__ == "__main__":
+    main()
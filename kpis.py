@@ -0,0 +1,115 @@
+# kpis.py
+#
+# Market KPI building blocks shared by the report scripts, the app and the
+# lazy report pipeline (report_pipeline.py). Each KPI is a small function of
+# the values it depends on, so callers can compute only what they need.
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+def priced_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """Competitor rows that have a usable lowest_price."""
+    return df.dropna(subset=["lowest_price"])
+
+
+def market_avg(priced: pd.DataFrame) -> float:
+    return priced["lowest_price"].mean()
+
+
+def market_min(priced: pd.DataFrame) -> float:
+    return priced["lowest_price"].min()
+
+
+def market_max(priced: pd.DataFrame) -> float:
+    return priced["lowest_price"].max()
+
+
+def price_gap(market_avg: float, my_price: float) -> float:
+    return market_avg - my_price
+
+
+def price_gap_pct(price_gap: float, market_avg: float) -> float:
+    return (price_gap / market_avg * 100) if market_avg else 0.0
+
+
+def promo_pressure(priced: pd.DataFrame) -> float:
+    """Share of competitors with a discount (0–100)."""
+    return priced["promo_flag"].mean() * 100
+
+
+def demand_signal(priced: pd.DataFrame, market_avg: float) -> pd.Series:
+    """
+    Simple demand proxy per competitor based on price level and promo usage:
+      at/above market, no promo -> 1.0 (high demand, no discount)
+      at/above market, promo    -> 0.8
+      below market, no promo    -> 0.7
+      below market, promo       -> 0.5 (cheap + discounted = weaker demand)
+    """
+    high = (priced["lowest_price"] >= market_avg).to_numpy()
+    promo = priced["promo_flag"].astype(bool).to_numpy()
+    values = np.select([high & ~promo, high & promo, ~high & ~promo], [1.0, 0.8, 0.7], default=0.5)
+    return pd.Series(values, index=priced.index, name="demand_signal")
+
+
+def occ_index(demand_signal: pd.Series) -> float:
+    """Demand / occupancy index on a 0–100 scale."""
+    return demand_signal.mean() * 100
+
+
+def recommended_price(my_price: float, market_avg: float) -> float:
+    """At least the market average if you are below it."""
+    return max(my_price, market_avg)
+
+
+def extra_per_unit(recommended_price: float, my_price: float) -> float:
+    return max(0.0, recommended_price - my_price)
+
+
+def annual_uplift(extra_per_unit: float, est_units: int) -> float:
+    return extra_per_unit * est_units * 12
+
+
+def compute_market_kpis(df: pd.DataFrame, my_price: float, est_units: int = 20) -> Dict:
+    """Compute simple KPIs from the market listing dataset."""
+    priced = priced_listings(df)
+
+    avg = market_avg(priced)
+    gap = price_gap(avg, my_price)
+    rec_price = recommended_price(my_price, avg)
+    extra = extra_per_unit(rec_price, my_price)
+
+    return {
+        "market_avg": avg,
+        "market_min": market_min(priced),
+        "market_max": market_max(priced),
+        "price_gap": gap,
+        "price_gap_pct": price_gap_pct(gap, avg),
+        "promo_pressure": promo_pressure(priced),
+        "occ_index": occ_index(demand_signal(priced, avg)),
+        "recommended_price": rec_price,
+        "annual_uplift": annual_uplift(extra, est_units),
+        "extra_per_unit": extra,
+    }
+
+
+def compute_kpis_by_unit_size(
+    units: pd.DataFrame, my_prices: Dict[str, float], est_units: Dict[str, int]
+) -> pd.DataFrame:
+    """
+    KPIs for every unit size from one long-format unit table
+    (see build_dataset_from_html.parse_storage_page). my_prices / est_units are
+    keyed by unit size, e.g. {"10x10": 185.0}; sizes you do not price are skipped.
+    """
+    rows = []
+    if "unit_size" not in units.columns:
+        return pd.DataFrame(rows)
+
+    for unit_size, group in units.groupby("unit_size"):
+        if unit_size not in my_prices or group["lowest_price"].dropna().empty:
+            continue
+        kpis = compute_market_kpis(group, my_prices[unit_size], est_units=est_units.get(unit_size, 20))
+        rows.append({"unit_size": unit_size, "n_competitors": group["lowest_price"].notna().sum(), **kpis})
+    return pd.DataFrame(rows)
@@ -0,0 +1,288 @@
+# listing_warehouse.py
+#
+# Local analytical store for parsed listings (SQLite, no server needed).
+#
+# 1. Ingests parsed listing DataFrames, one (market, scrape_date) snapshot at a time
+# 2. Pushes KPI aggregations down into SQL: market averages, promo pressure,
+#    demand index, Good/Fair/Risky price bands and per-date trends
+# 3. Only the small aggregate results come back into pandas, so years of scrapes
+#    stay queryable without loading them into memory
+#
+# The queries stick to portable SQL (CTEs, CASE, AVG/MIN/MAX) and named
+# parameters, so bigquery_sql() can rewrite them for the BigQuery warehouse.
+#
+# Usage:
+#   python listing_warehouse.py ingest storage_market_indianapolis.csv --market indianapolis --date 2026-10-01
+#   python listing_warehouse.py kpis --market indianapolis --date 2026-10-01
+#   python listing_warehouse.py trend --market indianapolis
+
+import argparse
+import re
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+import kpis as k
+from build_dataset_from_html import facility_keys
+
+WAREHOUSE_PATH = Path("storage_warehouse.sqlite")
+TABLE = "listings"
+
+LISTING_COLUMNS = {
+    "facility_name": "TEXT",
+    "relative_url": "TEXT",
+    "street": "TEXT",
+    "city": "TEXT",
+    "state": "TEXT",
+    "zip_code": "TEXT",
+    "distance_miles": "REAL",
+    "lowest_price": "REAL",
+    "starting_price": "REAL",
+    "promo_flag": "INTEGER",
+    "rating": "REAL",
+    "rating_count": "INTEGER",
+    "latitude": "REAL",
+    "longitude": "REAL",
+}
+
+
+# -------------------------------------------------------------------
+# SQL (portable – see bigquery_sql)
+# -------------------------------------------------------------------
+
+MARKET_KPIS_SQL = """
+WITH snap AS (
+    SELECT lowest_price, promo_flag
+    FROM {table}
+    WHERE market = :market AND scrape_date = :scrape_date AND lowest_price IS NOT NULL
+),
+avg_price AS (
+    SELECT AVG(lowest_price) AS market_avg FROM snap
+)
+SELECT
+    COUNT(*) AS n_listings,
+    (SELECT market_avg FROM avg_price) AS market_avg,
+    MIN(lowest_price) AS market_min,
+    MAX(lowest_price) AS market_max,
+    AVG(promo_flag) * 100 AS promo_pressure,
+    AVG(
+        CASE
+            WHEN lowest_price >= (SELECT market_avg FROM avg_price) AND COALESCE(promo_flag, 1) = 0 THEN 1.0
+            WHEN lowest_price >= (SELECT market_avg FROM avg_price) THEN 0.8
+            WHEN COALESCE(promo_flag, 1) = 0 THEN 0.7
+            ELSE 0.5
+        END
+    ) * 100 AS occ_index
+FROM snap
+"""
+
+PRICE_BANDS_SQL = """
+WITH snap AS (
+    SELECT lowest_price
+    FROM {table}
+    WHERE market = :market AND scrape_date = :scrape_date AND lowest_price IS NOT NULL
+),
+avg_price AS (
+    SELECT AVG(lowest_price) AS market_avg FROM snap
+),
+banded AS (
+    SELECT
+        CASE
+            WHEN ABS(lowest_price - market_avg) / market_avg * 100 <= 5 THEN 'Good (±5%)'
+            WHEN ABS(lowest_price - market_avg) / market_avg * 100 <= 10 THEN 'Fair (5–10%)'
+            ELSE 'Risky (>10%)'
+        END AS price_band
+    FROM snap CROSS JOIN avg_price
+)
+SELECT
+    price_band,
+    COUNT(*) * 100.0 / (SELECT COUNT(*) FROM snap) AS share_pct
+FROM banded
+GROUP BY price_band
+ORDER BY share_pct DESC
+"""
+
+TREND_SQL = """
+SELECT
+    scrape_date,
+    COUNT(*) AS n_listings,
+    AVG(lowest_price) AS market_avg,
+    MIN(lowest_price) AS market_min,
+    MAX(lowest_price) AS market_max,
+    AVG(promo_flag) * 100 AS promo_pressure
+FROM {table}
+WHERE market = :market
+  AND lowest_price IS NOT NULL
+  AND scrape_date BETWEEN :start_date AND :end_date
+GROUP BY scrape_date
+ORDER BY scrape_date
+"""
+
+
+def bigquery_sql(sql: str, table: str) -> str:
+    """Rewrite a warehouse query for BigQuery: fully-qualified table, @named parameters."""
+    return re.sub(r":(\w+)", r"@\1", sql.format(table=f"`{table}`"))
+
+
+# -------------------------------------------------------------------
+# WAREHOUSE
+# -------------------------------------------------------------------
+
+class ListingWarehouse:
+    def __init__(self, path: Path = WAREHOUSE_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self._create_schema()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _create_schema(self):
+        cols = ",\n    ".join(f"{name} {sql_type}" for name, sql_type in LISTING_COLUMNS.items())
+        self.conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS {TABLE} (
+                market TEXT NOT NULL,
+                scrape_date TEXT NOT NULL,
+                facility_key TEXT NOT NULL,
+                {cols},
+                PRIMARY KEY (market, scrape_date, facility_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_{TABLE}_date ON {TABLE} (scrape_date, market);
+            """
+        )
+
+    def ingest(self, df: pd.DataFrame, market: str, scrape_date: Optional[str] = None) -> int:
+        """Insert (or replace) one market snapshot. Returns the number of rows written."""
+        scrape_date = scrape_date or date.today().isoformat()
+
+        snap = df.reindex(columns=list(LISTING_COLUMNS))
+        # Missing flags stay NULL: AVG() skips them, the demand CASE counts them as promo
+        snap["promo_flag"] = snap["promo_flag"].astype("boolean").astype("Int64")
+        snap["zip_code"] = snap["zip_code"].astype("string")
+        snap.insert(0, "facility_key", facility_keys(df))
+        snap.insert(0, "scrape_date", scrape_date)
+        snap.insert(0, "market", market)
+        snap = snap.drop_duplicates(subset=["facility_key"], keep="first")
+
+        # NaN -> NULL
+        records = snap.astype(object).where(snap.notna(), None).itertuples(index=False, name=None)
+        placeholders = ", ".join("?" for _ in snap.columns)
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {TABLE} ({', '.join(snap.columns)}) VALUES ({placeholders})",
+                records,
+            )
+        return len(snap)
+
+    def query(self, sql: str, **params) -> pd.DataFrame:
+        """Run a warehouse query ({table} is filled in) and return the result rows."""
+        return pd.read_sql_query(sql.format(table=TABLE), self.conn, params=params)
+
+    def markets(self) -> pd.DataFrame:
+        return self.query(
+            "SELECT market, COUNT(DISTINCT scrape_date) AS n_dates, MAX(scrape_date) AS latest "
+            "FROM {table} GROUP BY market ORDER BY market"
+        )
+
+    def latest_date(self, market: str) -> Optional[str]:
+        row = self.conn.execute(
+            f"SELECT MAX(scrape_date) FROM {TABLE} WHERE market = ?", (market,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def market_kpis(self, market: str, scrape_date: str, my_price: float, est_units: int = 20) -> Dict:
+        """Same dict as kpis.compute_market_kpis, with the aggregation done in SQL."""
+        agg = self.query(MARKET_KPIS_SQL, market=market, scrape_date=scrape_date).iloc[0]
+        if agg["n_listings"] == 0:
+            raise KeyError(f"No priced listings for {market} @ {scrape_date}")
+
+        avg = agg["market_avg"]
+        gap = k.price_gap(avg, my_price)
+        rec_price = k.recommended_price(my_price, avg)
+        extra = k.extra_per_unit(rec_price, my_price)
+
+        return {
+            "market_avg": avg,
+            "market_min": agg["market_min"],
+            "market_max": agg["market_max"],
+            "price_gap": gap,
+            "price_gap_pct": k.price_gap_pct(gap, avg),
+            "promo_pressure": agg["promo_pressure"],
+            "occ_index": agg["occ_index"],
+            "recommended_price": rec_price,
+            "annual_uplift": k.annual_uplift(extra, est_units),
+            "extra_per_unit": extra,
+        }
+
+    def price_bands(self, market: str, scrape_date: str) -> pd.DataFrame:
+        return self.query(PRICE_BANDS_SQL, market=market, scrape_date=scrape_date)
+
+    def trend(self, market: str, start_date: str = "0000-01-01", end_date: str = "9999-12-31") -> pd.DataFrame:
+        return self.query(TREND_SQL, market=market, start_date=start_date, end_date=end_date)
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Local listing warehouse.")
+    parser.add_argument("--db", type=Path, default=WAREHOUSE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="Load a parsed listings CSV")
+    p_ingest.add_argument("csv", type=Path)
+    p_ingest.add_argument("--market", required=True)
+    p_ingest.add_argument("--date", help="Scrape date (YYYY-MM-DD), default today")
+
+    p_kpis = sub.add_parser("kpis", help="Market KPIs for one snapshot")
+    p_kpis.add_argument("--market", required=True)
+    p_kpis.add_argument("--date", help="Scrape date, default latest")
+    p_kpis.add_argument("--my-price", type=float, default=60.0)
+    p_kpis.add_argument("--est-units", type=int, default=20)
+
+    p_trend = sub.add_parser("trend", help="Per-date market trend")
+    p_trend.add_argument("--market", required=True)
+
+    sub.add_parser("markets", help="List markets in the warehouse")
+    args = parser.parse_args()
+
+    with ListingWarehouse(args.db) as wh:
+        if args.command == "ingest":
+            n = wh.ingest(pd.read_csv(args.csv), args.market, args.date)
+            print(f"Ingested {n} listings for {args.market} into {args.db.resolve()}")
+
+        elif args.command == "kpis":
+            scrape_date = args.date or wh.latest_date(args.market)
+            if scrape_date is None:
+                print(f"No snapshots for market {args.market!r} in {args.db.resolve()}")
+                return
+            try:
+                kpis = wh.market_kpis(args.market, scrape_date, args.my_price, args.est_units)
+            except KeyError as exc:
+                print(exc.args[0])
+                return
+            print(f"=== {args.market} @ {scrape_date} ===")
+            for name, value in kpis.items():
+                print(f"  {name}: {value:.2f}")
+            print(wh.price_bands(args.market, scrape_date).to_string(index=False))
+
+        elif args.command == "trend":
+            print(wh.trend(args.market).to_string(index=False))
+
+        else:
+            print(wh.markets().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# market_watcher.py
+#
+# Long-running watcher that keeps market KPIs fresh.
+#
+# 1. Re-scrapes each configured city on its own schedule (asyncio, bounded
+#    concurrency); one scrape serves every unit size watched in that city
+# 2. Diffs the new snapshot against the previous one (snapshot_diff.py); unchanged
+#    markets stop there
+# 3. For changed markets only: recomputes KPIs, the Raise / Hold / Defend tag and
+#    charts (report_pipeline.py)
+# 4. Emits an alert when a market's action flips, e.g. Hold -> Raise
+#
+# Usage:
+#   python market_watcher.py markets.json [--base-url http://127.0.0.1:8000] [--once]
+#
+# markets.json:
+#   [{"state": "indiana", "city": "indianapolis", "interval_minutes": 60,
+#     "my_price": 60, "est_units": 20, "unit_size": "10x10"}, ...]
+
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from advanced_analytics import classify_action
+from report_pipeline import run_report
+from snapshot_diff import diff_snapshots
+from storage_scraper import BASE_URL, scrape_city_market_tables
+
+MAX_CONCURRENT_SCRAPES = 4
+OUTPUT_DIR = Path("watched_markets")
+
+# Recomputed for every changed market
+WATCH_OUTPUTS = ["kpis", "action", "price_comparison_chart", "top_underpriced_chart", "price_band_share_chart"]
+
+
+@dataclass
+class WatchedMarket:
+    state: str
+    city: str
+    interval_minutes: float = 60.0
+    my_price: float = 60.0
+    est_units: int = 20
+    unit_size: Optional[str] = None
+    zip_code: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """state/city[/unit_size][/zip_code] – also the output sub-directory."""
+        return "/".join(part for part in (self.state, self.city, self.unit_size, self.zip_code) if part)
+
+    @property
+    def location(self) -> Tuple[str, str, Optional[str]]:
+        """(state, city, zip_code) – the scrape this market's listings come from."""
+        return (self.state, self.city, self.zip_code)
+
+
+def market_snapshot(market: WatchedMarket, facility_rows: List[Dict], unit_rows: List[Dict]) -> pd.DataFrame:
+    """
+    One watched market's listings from its city's scrape: the unit table filtered
+    to market.unit_size (as app.unit_size_listings does), or the card-level "from"
+    prices when no unit size is configured.
+    """
+    if market.unit_size is None:
+        return pd.DataFrame(facility_rows)
+    units = pd.DataFrame(unit_rows)
+    if units.empty:
+        return units
+    return units[units["unit_size"] == market.unit_size].reset_index(drop=True)
+
+
+@dataclass
+class MarketState:
+    snapshot: Optional[pd.DataFrame] = None
+    kpis: Optional[Dict] = None
+    action: Optional[str] = None
+    last_checked: Optional[datetime] = None
+    last_changed: Optional[datetime] = None
+
+
+@dataclass
+class Alert:
+    market: str
+    old_action: str
+    new_action: str
+    kpis: Dict
+    n_changes: int
+    at: datetime = field(default_factory=datetime.now)
+
+    def __str__(self) -> str:
+        return (
+            f"[{self.at:%Y-%m-%d %H:%M}] {self.market}: {self.old_action} -> {self.new_action} "
+            f"(market avg ${self.kpis['market_avg']:.0f}, gap {self.kpis['price_gap_pct']:.1f}%, "
+            f"{self.n_changes} competitor changes)"
+        )
+
+
+class MarketWatcher:
+    def __init__(
+        self,
+        markets: List[WatchedMarket],
+        base_url: str = BASE_URL,
+        max_concurrency: int = MAX_CONCURRENT_SCRAPES,
+        output_dir: Path = OUTPUT_DIR,
+        outputs: List[str] = WATCH_OUTPUTS,
+        on_alert: Optional[Callable[[Alert], None]] = None,
+    ):
+        self.markets = markets
+        self.base_url = base_url
+        self.output_dir = Path(output_dir)
+        self.outputs = outputs
+        self.on_alert = on_alert or (lambda alert: print(f"ALERT {alert}"))
+        self.state: Dict[str, MarketState] = {m.key: MarketState() for m in markets}
+        if len(self.state) != len(markets):
+            raise ValueError("Watched markets must be unique by state, city, unit_size and zip_code")
+        self.locations: Dict[Tuple, List[WatchedMarket]] = {}
+        for market in markets:
+            self.locations.setdefault(market.location, []).append(market)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def scrape(self, location: Tuple) -> Tuple[List[Dict], List[Dict]]:
+        """Fetch one city's result pages once: (facility_rows, unit_rows) for every unit size."""
+        state, city, zip_code = location
+        async with self._semaphore:
+            return await asyncio.to_thread(
+                scrape_city_market_tables, state, city, zip_code=zip_code, base_url=self.base_url
+            )
+
+    async def refresh(self, market: WatchedMarket, tables: Optional[Tuple] = None) -> bool:
+        """
+        Recompute one market if its listings changed. tables is its city's
+        (facility_rows, unit_rows) from scrape(); fetched here if not given.
+        Returns True if it changed.
+        """
+        if tables is None:
+            tables = await self.scrape(market.location)
+
+        state = self.state[market.key]
+        state.last_checked = datetime.now()
+        snapshot = market_snapshot(market, *tables)
+        if snapshot.empty:
+            print(f"{market.key}: no listings returned, keeping previous snapshot.")
+            return False
+
+        if state.snapshot is not None:
+            changes = diff_snapshots(state.snapshot, snapshot)
+            if changes.empty:
+                return False
+            n_changes = len(changes)
+        else:
+            n_changes = len(snapshot)
+
+        out_dir = self.output_dir / market.key
+        out_dir.mkdir(parents=True, exist_ok=True)
+        results = await asyncio.to_thread(
+            run_report, snapshot, self.outputs, market.my_price, market.est_units, out_dir
+        )
+        kpis = results.get("kpis")
+        action = results.get("action") or classify_action(kpis)
+
+        if state.action is not None and action != state.action:
+            self.on_alert(Alert(market.key, state.action, action, kpis, n_changes))
+
+        state.snapshot = snapshot
+        state.kpis = kpis
+        state.action = action
+        state.last_changed = state.last_checked
+        print(f"{market.key}: {n_changes} changes, action {action}")
+        return True
+
+    async def refresh_location(self, location: Tuple) -> List[str]:
+        """Scrape one city once and refresh every market watched there. Returns keys of markets that changed."""
+        markets = self.locations[location]
+        try:
+            tables = await self.scrape(location)
+        except Exception as exc:  # keep watching other cities / later runs
+            print(f"{'/'.join(part for part in location if part)}: scrape failed: {exc!r}")
+            return []
+        changed = await asyncio.gather(*(self._safe_refresh(m, tables) for m in markets))
+        return [m.key for m, did_change in zip(markets, changed) if did_change]
+
+    async def run_once(self) -> List[str]:
+        """Refresh every market once, one scrape per city (concurrently). Returns keys of markets that changed."""
+        changed = await asyncio.gather(*(self.refresh_location(loc) for loc in self.locations))
+        changed_keys = {key for keys in changed for key in keys}
+        return [m.key for m in self.markets if m.key in changed_keys]
+
+    async def _safe_refresh(self, market: WatchedMarket, tables: Tuple) -> bool:
+        try:
+            return await self.refresh(market, tables)
+        except Exception as exc:  # keep watching other markets / later runs
+            print(f"{market.key}: refresh failed: {exc!r}")
+            return False
+
+    async def _watch(self, location: Tuple):
+        # Unit sizes of one city share its scrape, so the city runs at their shortest interval
+        interval = min(m.interval_minutes for m in self.locations[location])
+        while True:
+            await self.refresh_location(location)
+            await asyncio.sleep(interval * 60)
+
+    async def run_forever(self):
+        await asyncio.gather(*(self._watch(loc) for loc in self.locations))
+
+
+def load_markets(path: Path) -> List[WatchedMarket]:
+    return [WatchedMarket(**entry) for entry in json.loads(Path(path).read_text(encoding="utf-8"))]
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep market KPIs fresh.")
+    parser.add_argument("config", type=Path, help="JSON list of markets")
+    parser.add_argument("--base-url", default=BASE_URL, help="Search site (or local fixture server)")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_SCRAPES)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--once", action="store_true", help="Refresh every market once and exit")
+    args = parser.parse_args()
+
+    async def run():
+        watcher = MarketWatcher(load_markets(args.config), args.base_url, args.concurrency, args.output_dir)
+        if args.once:
+            await watcher.run_once()
+        else:
+            await watcher.run_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# pipeline_profiler.py
+#
+# Lightweight stage profiler for the pipeline scripts.
+#
+# 1. Wrap pipeline stages in `with stage("parse") as s: ...; s.set(rows=len(df))`
+# 2. Records nested spans with wall time, CPU time, peak RSS and row counts
+# 3. Exports a Chrome trace-event JSON (open in chrome://tracing or ui.perfetto.dev)
+#    and a summary table (CSV + printed)
+#
+# Profiling is off unless the PIPELINE_PROFILE environment variable points to an
+# output folder, e.g.:  PIPELINE_PROFILE=profiles python analyze_kpis_and_charts.py
+# When off, stage() returns a shared no-op object, so the cost is one function call.
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None if the platform cannot tell)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+class _Stage:
+    """One open span. Use set() to attach row counts or other details."""
+
+    def __init__(self, profiler: "Profiler", name: str, args: Dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        local = self.profiler._local
+        self.depth = getattr(local, "depth", 0)
+        local.depth = self.depth + 1
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_end = time.perf_counter()
+        cpu_end = time.thread_time()
+        self.profiler._local.depth = self.depth
+
+        self.profiler._record(
+            {
+                "name": self.name,
+                "depth": self.depth,
+                "thread_id": threading.get_ident(),
+                "start_ms": (self.wall_start - self.profiler.t0) * 1000,
+                "wall_ms": (wall_end - self.wall_start) * 1000,
+                "cpu_ms": (cpu_end - self.cpu_start) * 1000,
+                "peak_rss_mb": peak_rss_mb(),
+                "rows": self.args.pop("rows", None),
+                "error": exc_type.__name__ if exc_type else None,
+                "args": self.args,
+            }
+        )
+        return False
+
+
+class _NullStage:
+    """Returned by stage() while profiling is disabled."""
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.spans: List[Dict] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, **args) -> _Stage:
+        return _Stage(self, name, args)
+
+    def _record(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_chrome_trace(self) -> Dict:
+        """Spans as Chrome trace 'complete' (ph=X) events, timestamps in microseconds."""
+        pid = os.getpid()
+        events = []
+        for s in sorted(self.spans, key=lambda s: s["start_ms"]):
+            args = dict(s["args"], cpu_ms=round(s["cpu_ms"], 3))
+            if s["rows"] is not None:
+                args["rows"] = s["rows"]
+            if s["peak_rss_mb"] is not None:
+                args["peak_rss_mb"] = round(s["peak_rss_mb"], 1)
+            if s["error"]:
+                args["error"] = s["error"]
+            events.append(
+                {
+                    "name": s["name"],
+                    "cat": "pipeline",
+                    "ph": "X",
+                    "ts": s["start_ms"] * 1000,
+                    "dur": s["wall_ms"] * 1000,
+                    "pid": pid,
+                    "tid": s["thread_id"],
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: Path):
+        Path(path).write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+
+    def summary(self) -> pd.DataFrame:
+        """One row per span in start order, stage names indented by nesting depth."""
+        if not self.spans:
+            return pd.DataFrame(columns=["stage", "wall_ms", "cpu_ms", "peak_rss_mb", "rows"])
+
+        df = pd.DataFrame(sorted(self.spans, key=lambda s: s["start_ms"]))
+        df["stage"] = ["  " * d + n for d, n in zip(df["depth"], df["name"])]
+        df["rows"] = df["rows"].astype("Int64")
+        return df[["stage", "wall_ms", "cpu_ms", "peak_rss_mb", "rows"]]
+
+
+_PROFILER: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    global _PROFILER
+    _PROFILER = Profiler()
+    return _PROFILER
+
+
+def disable():
+    global _PROFILER
+    _PROFILER = None
+
+
+def stage(name: str, **args):
+    """Open a profiling span (no-op unless profiling is enabled)."""
+    if _PROFILER is None:
+        return _NULL_STAGE
+    return _PROFILER.stage(name, **args)
+
+
+def run_profiled(main_fn: Callable[[], None], label: str):
+    """
+    Run an entry point. If PIPELINE_PROFILE is set, profile it and write
+    <label>_trace.json and <label>_profile.csv into that folder.
+    """
+    out_dir = os.environ.get(PROFILE_ENV)
+    if not out_dir:
+        main_fn()
+        return
+
+    profiler = enable()
+    try:
+        with stage(label):
+            main_fn()
+    finally:
+        disable()
+        out_path = Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+
+        trace_path = out_path / f"{label}_trace.json"
+        profiler.export_chrome_trace(trace_path)
+        summary = profiler.summary()
+        summary.to_csv(out_path / f"{label}_profile.csv", index=False)
+
+        print("\n=== Stage profile ===")
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+        print(f"Saved Chrome trace to: {trace_path.resolve()}")
@@ -0,0 +1,163 @@
+# price_optimizer.py
+#
+# Revenue-maximising prices for a whole portfolio (facility x unit type).
+#
+# compute_market_kpis recommends max(my_price, market_avg), which ignores how
+# demand reacts to price. Here each SKU gets a logistic demand curve:
+#
+#   occupancy(p) = 1 / (1 + exp(-(a - b * (p - market_avg) / market_std)))
+#
+#   - market_avg / market_std come from the competitor price distribution
+#   - a is set so occupancy(market_avg) equals the market demand signal (occ_index)
+#   - b (DEMAND_STEEPNESS) is how fast occupancy falls per competitor std above market
+#
+# Expected annual revenue p * occupancy(p) * units * 12 is maximised over a
+# price grid inside the guardrails (max step from today's price, band around
+# market). All SKUs are solved together as one (n_skus x grid) NumPy array.
+#
+# Usage:
+#   python price_optimizer.py portfolio.csv storage_listings.csv
+#   (portfolio: market, facility, unit_size, my_price, est_units;
+#    listings:  market[, unit_size], lowest_price, promo_flag)
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kpis import demand_signal
+
+DEMAND_STEEPNESS = 1.0
+MAX_STEP_PCT = 0.10        # never move more than 10% from today's price in one go
+MARKET_BAND_PCT = 0.15     # stay within ±15% of market average
+GRID_POINTS = 201
+MIN_MARKET_STD_PCT = 0.05  # floor for the price spread (5% of market avg) in thin markets
+OCC_CLIP = (0.05, 0.99)    # keep the fitted intercept finite
+
+
+def market_price_stats(listings: pd.DataFrame, keys=("market",)) -> pd.DataFrame:
+    """Per-market competitor price average, spread and demand index (0–100)."""
+    keys = [key for key in keys if key in listings.columns]
+    priced = listings.dropna(subset=["lowest_price"])
+
+    rows = []
+    for key_values, group in priced.groupby(keys):
+        key_values = key_values if isinstance(key_values, tuple) else (key_values,)
+        avg = group["lowest_price"].mean()
+        rows.append(
+            {
+                **dict(zip(keys, key_values)),
+                "market_avg": avg,
+                "market_std": group["lowest_price"].std(ddof=0),
+                "occ_index": demand_signal(group, avg).mean() * 100,
+                "n_competitors": len(group),
+            }
+        )
+    return pd.DataFrame(rows, columns=[*keys, "market_avg", "market_std", "occ_index", "n_competitors"])
+
+
+def expected_occupancy(prices: np.ndarray, market_avg, market_std, occ_index) -> np.ndarray:
+    """Logistic demand curve, broadcasting over SKUs (rows) and candidate prices (columns)."""
+    base = np.clip(np.asarray(occ_index, dtype=float) / 100.0, *OCC_CLIP)
+    intercept = np.log(base / (1 - base))
+    z = (prices - market_avg) / market_std
+    return 1.0 / (1.0 + np.exp(-(intercept - DEMAND_STEEPNESS * z)))
+
+
+def optimise_portfolio_prices(
+    portfolio: pd.DataFrame,
+    max_step_pct: float = MAX_STEP_PCT,
+    market_band_pct: float = MARKET_BAND_PCT,
+    grid_points: int = GRID_POINTS,
+) -> pd.DataFrame:
+    """
+    portfolio needs: my_price, est_units, market_avg, market_std, occ_index
+    (see market_price_stats). Returns a copy with the optimal price and revenue columns.
+    """
+    out = portfolio.copy()
+
+    my_price = out["my_price"].to_numpy(dtype=float)
+    units = out["est_units"].to_numpy(dtype=float)
+    avg = out["market_avg"].to_numpy(dtype=float)
+    std = np.maximum(np.nan_to_num(out["market_std"].to_numpy(dtype=float)), avg * MIN_MARKET_STD_PCT)
+    occ_index = out["occ_index"].to_numpy(dtype=float)
+
+    # Guardrails: intersect the step window with the market band
+    step_lo, step_hi = my_price * (1 - max_step_pct), my_price * (1 + max_step_pct)
+    band_lo, band_hi = avg * (1 - market_band_pct), avg * (1 + market_band_pct)
+    lo = np.maximum(step_lo, band_lo)
+    hi = np.minimum(step_hi, band_hi)
+
+    # Today's price is too far from the band to reach it in one step:
+    # move as far toward the band as the step allows
+    infeasible = lo > hi
+    toward_band = np.clip(np.clip(my_price, band_lo, band_hi), step_lo, step_hi)
+    lo = np.where(infeasible, toward_band, lo)
+    hi = np.where(infeasible, toward_band, hi)
+
+    grid = np.linspace(0.0, 1.0, grid_points)[None, :]
+    prices = lo[:, None] + (hi - lo)[:, None] * grid                       # (n_skus, grid)
+    occ = expected_occupancy(prices, avg[:, None], std[:, None], occ_index[:, None])
+    revenue = prices * occ * units[:, None] * 12
+
+    best = revenue.argmax(axis=1)
+    rows = np.arange(len(out))
+    optimal_price = prices[rows, best]
+
+    current_occ = expected_occupancy(my_price, avg, std, occ_index)
+    current_revenue = my_price * current_occ * units * 12
+
+    out["optimal_price"] = optimal_price.round(2)
+    out["expected_occupancy_pct"] = occ[rows, best] * 100
+    out["expected_annual_revenue"] = revenue[rows, best]
+    out["current_annual_revenue"] = current_revenue
+    out["annual_uplift"] = revenue[rows, best] - current_revenue
+
+    at_step = np.isclose(optimal_price, step_lo) | np.isclose(optimal_price, step_hi)
+    at_band = np.isclose(optimal_price, band_lo) | np.isclose(optimal_price, band_hi)
+    out["binding_guardrail"] = np.select([infeasible | at_step, at_band], ["max_step", "market_band"], default="")
+    return out
+
+
+def optimal_price_for_market(df: pd.DataFrame, my_price: float, est_units: int) -> float:
+    """Single-facility helper: optimal price for one listing dataset."""
+    stats = market_price_stats(df.assign(market="market"))
+    if stats.empty:
+        raise ValueError("No priced listings to optimise against")
+    portfolio = stats.assign(my_price=my_price, est_units=est_units)
+    return float(optimise_portfolio_prices(portfolio)["optimal_price"].iloc[0])
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Revenue-maximising prices for a portfolio.")
+    parser.add_argument("portfolio_csv", type=Path)
+    parser.add_argument("listings_csv", type=Path)
+    parser.add_argument("--max-step", type=float, default=MAX_STEP_PCT)
+    parser.add_argument("--band", type=float, default=MARKET_BAND_PCT)
+    parser.add_argument("--output", type=Path, default=Path("optimal_prices.csv"))
+    args = parser.parse_args()
+
+    portfolio = pd.read_csv(args.portfolio_csv)
+    listings = pd.read_csv(args.listings_csv)
+
+    keys = ["market", "unit_size"] if "unit_size" in listings.columns else ["market"]
+    stats = market_price_stats(listings, keys)
+    portfolio = portfolio.merge(stats, on=keys, how="left")
+
+    missing = portfolio["market_avg"].isna()
+    if missing.any():
+        print(f"Skipping {missing.sum()} SKUs without competitor prices.")
+
+    result = optimise_portfolio_prices(portfolio[~missing], args.max_step, args.band)
+    result.to_csv(args.output, index=False)
+    print(f"Optimised {len(result)} SKUs; total expected uplift ${result['annual_uplift'].sum():,.0f}/year")
+    print(f"Saved optimal prices to: {args.output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# ranking_index.py
+#
+# Persisted competitor rankings per market and scrape date.
+#
+# 1. For every (market, scrape_date) keeps bounded top-K heaps for:
+#      underpriced    – lowest prices (gap vs market avg computed at query time)
+#      overpriced     – highest prices
+#      highest_rated  – rating, then number of reviews
+#      heaviest_promo – deepest discount off the crossed-out price
+# 2. Updated incrementally as listings arrive (page by page, market by market):
+#    O(log K) per listing, plus a running price sum / count for the market average
+# 3. Cross-market queries merge the small per-market heaps instead of sorting
+#    raw listings
+# 4. The facility keys already folded in (needed to skip repeats while a
+#    snapshot is still being filled) live in a separate sidecar file, and are
+#    dropped once a newer snapshot for the market arrives, so the index itself
+#    only holds heaps plus price sum / count
+#
+# Usage:
+#   python ranking_index.py add storage_market_indianapolis.csv --market indianapolis --date 2026-10-01
+#   python ranking_index.py top underpriced --k 10
+
+import argparse
+import heapq
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from build_dataset_from_html import facility_keys
+
+INDEX_PATH = Path("ranking_index.json")
+TOP_K = 25      # kept per market/date/metric; queries can ask for up to this many
+
+METRICS = ["underpriced", "overpriced", "highest_rated", "heaviest_promo"]
+
+RECORD_FIELDS = ["facility_name", "lowest_price", "starting_price", "promo_flag", "rating", "rating_count"]
+
+
+def _score(metric: str, rec: Dict) -> Optional[list]:
+    """Heap score for one listing (bigger = ranks higher), or None if it does not qualify."""
+    price = rec.get("lowest_price")
+    if metric == "underpriced":
+        return None if price is None else [-price]
+    if metric == "overpriced":
+        return None if price is None else [price]
+    if metric == "highest_rated":
+        rating = rec.get("rating")
+        return None if rating is None else [rating, rec.get("rating_count") or 0]
+    # heaviest_promo
+    start = rec.get("starting_price")
+    if not rec.get("promo_flag") or price is None or not start:
+        return None
+    return [(start - price) / start]
+
+
+class RankingIndex:
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        # market -> scrape_date -> {"count", "price_sum", "heaps": {metric: [...]}}
+        self.entries: Dict[str, Dict[str, Dict]] = {}
+        # market -> scrape_date -> facility keys, for snapshots still being filled
+        self.seen: Dict[str, Dict[str, List[str]]] = {}
+        self._seen_loaded = True
+
+    # -- persistence ---------------------------------------------------
+
+    @staticmethod
+    def seen_path(path: Path) -> Path:
+        return Path(path).with_suffix(".seen.json")
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH, for_update: bool = False) -> "RankingIndex":
+        """Load the index; queries skip the seen-keys sidecar, updates (for_update=True) need it."""
+        index = cls()
+        path = Path(path)
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            index.k = data["k"]
+            index.entries = data["entries"]
+        index._seen_loaded = for_update
+        if for_update and cls.seen_path(path).exists():
+            index.seen = json.loads(cls.seen_path(path).read_text(encoding="utf-8"))
+        return index
+
+    def save(self, path: Path = INDEX_PATH):
+        path = Path(path)
+        files = {path: {"k": self.k, "entries": self.entries}}
+        if self._seen_loaded:
+            files[self.seen_path(path)] = self.seen
+        for target, data in files.items():
+            tmp = target.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, target)
+
+    # -- maintenance ---------------------------------------------------
+
+    @staticmethod
+    def _empty_entry() -> Dict:
+        return {"count": 0, "price_sum": 0.0, "heaps": {m: [] for m in METRICS}}
+
+    def _entry(self, market: str, scrape_date: str) -> Dict:
+        return self.entries.setdefault(market, {}).setdefault(scrape_date, self._empty_entry())
+
+    def finalize(self, market: str, scrape_date: Optional[str] = None):
+        """Forget the seen keys of a finished snapshot (default: every snapshot before the latest)."""
+        dates = self.seen.get(market, {})
+        if scrape_date is not None:
+            dates.pop(scrape_date, None)
+        elif dates:
+            latest = max(dates)
+            for snap_date in [d for d in dates if d != latest]:
+                del dates[snap_date]
+        if not dates:
+            self.seen.pop(market, None)
+
+    def add_listings(self, market: str, scrape_date: str, df: pd.DataFrame) -> int:
+        """
+        Fold new listings into the market/date rankings. Returns how many were new.
+        Adding to a finalized snapshot starts it over (e.g. re-indexing a re-parsed scrape).
+        """
+        if not self._seen_loaded:
+            raise RuntimeError("Index was loaded for queries only; use RankingIndex.load(path, for_update=True)")
+        dates = self.entries.get(market, {})
+        if scrape_date in dates and scrape_date not in self.seen.get(market, {}):
+            # A finalized snapshot has no seen keys to dedupe against: replace it outright
+            dates[scrape_date] = self._empty_entry()
+        entry = self._entry(market, scrape_date)
+        # Snapshots older than this one are final: their seen keys are no longer needed
+        for snap_date in [d for d in self.seen.get(market, {}) if d < scrape_date]:
+            self.finalize(market, snap_date)
+        seen_keys = self.seen.setdefault(market, {}).setdefault(scrape_date, [])
+        seen = set(seen_keys)
+
+        snap = df.reindex(columns=RECORD_FIELDS).astype(object)
+        snap = snap.where(snap.notna(), None)
+        snap["facility_key"] = facility_keys(df.reindex(columns=["facility_name", "zip_code", "relative_url"]))
+
+        added = 0
+        for rec in snap.to_dict(orient="records"):
+            key = rec.pop("facility_key")
+            if key in seen:
+                continue
+            seen.add(key)
+            seen_keys.append(key)
+            added += 1
+
+            rec["promo_flag"] = bool(rec["promo_flag"])
+            if rec["lowest_price"] is not None:
+                entry["count"] += 1
+                entry["price_sum"] += float(rec["lowest_price"])
+
+            for metric in METRICS:
+                score = _score(metric, rec)
+                if score is None:
+                    continue
+                # [score..., key, record]: key breaks ties so records are never compared
+                item = score + [key, rec]
+                heap = entry["heaps"][metric]
+                if len(heap) < self.k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        return added
+
+    # -- queries -------------------------------------------------------
+
+    def market_avg(self, market: str, scrape_date: str) -> Optional[float]:
+        entry = self.entries[market][scrape_date]
+        return entry["price_sum"] / entry["count"] if entry["count"] else None
+
+    def latest_date(self, market: str) -> str:
+        return max(self.entries[market])
+
+    def top(
+        self,
+        metric: str,
+        k: int = 10,
+        markets: Optional[List[str]] = None,
+        scrape_date: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Top-k competitors for a metric across markets (default: all markets, each
+        at its latest scrape date).
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; choose from {METRICS}")
+        if k > self.k:
+            raise ValueError(f"Index keeps top {self.k} per market; rebuild with a larger k")
+
+        candidates = []
+        for market in markets or list(self.entries):
+            dates = self.entries.get(market, {})
+            snap_date = scrape_date or (max(dates) if dates else None)
+            if snap_date not in dates:
+                continue
+
+            avg = self.market_avg(market, snap_date)
+            for item in dates[snap_date]["heaps"][metric]:
+                rec = item[-1]
+                row = {"market": market, "scrape_date": snap_date, "facility_key": item[-2], **rec,
+                       "market_avg": avg}
+                if metric == "underpriced":
+                    row["score"] = avg - rec["lowest_price"]
+                elif metric == "overpriced":
+                    row["score"] = rec["lowest_price"] - avg
+                elif metric == "highest_rated":
+                    row["score"] = rec["rating"]
+                else:
+                    row["score"] = item[0] * 100  # discount %
+                candidates.append((item[:-2], row))
+
+        # Per-market heaps are ordered by the metric; across markets the gap vs
+        # each market's own average decides, so rank by the computed score
+        if metric in ("underpriced", "overpriced"):
+            best = heapq.nlargest(k, candidates, key=lambda c: c[1]["score"])
+        else:
+            best = heapq.nlargest(k, candidates, key=lambda c: c[0])
+
+        if metric == "underpriced":
+            best = [c for c in best if c[1]["score"] > 0]
+        return pd.DataFrame([row for _, row in best])
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Competitor ranking index.")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="Add a listings CSV to the index")
+    p_add.add_argument("csv", type=Path)
+    p_add.add_argument("--market", required=True)
+    p_add.add_argument("--date", help="Scrape date (YYYY-MM-DD), default today")
+
+    p_top = sub.add_parser("top", help="Query the top competitors")
+    p_top.add_argument("metric", choices=METRICS)
+    p_top.add_argument("--k", type=int, default=10)
+    p_top.add_argument("--market", action="append", help="Limit to market(s)")
+    p_top.add_argument("--date", help="Scrape date, default each market's latest")
+    args = parser.parse_args()
+
+    index = RankingIndex.load(args.index, for_update=args.command == "add")
+    if args.command == "add":
+        n = index.add_listings(args.market, args.date or date.today().isoformat(), pd.read_csv(args.csv))
+        index.save(args.index)
+        print(f"Added {n} listings for {args.market} to {args.index.resolve()}")
+        return
+
+    result = index.top(args.metric, args.k, args.market, args.date)
+    cols = ["market", "facility_name", "lowest_price", "rating", "market_avg", "score"]
+    print(result[cols].to_string(index=False) if not result.empty else "No competitors found.")
+
+
+if __name__ == "__main__":
+    main()
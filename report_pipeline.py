@@ -0,0 +1,256 @@
+# report_pipeline.py
+#
+# Lazy report pipeline: every KPI, table and chart is a node with declared inputs.
+#
+# 1. Ask for a set of outputs, e.g. ["recommended_price", "annual_uplift"]
+# 2. Only the nodes those outputs depend on are executed (shared intermediates run once)
+# 3. Independent nodes run concurrently in a thread pool; chart nodes share one
+#    lock because matplotlib's pyplot state is not thread-safe
+#
+# Usage:
+#   python report_pipeline.py recommended_price annual_uplift
+#   python report_pipeline.py --csv storage_market_indianapolis.csv kpis top_underpriced_chart
+
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")  # chart nodes draw in worker threads, which GUI backends do not allow
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import advanced_analytics as adv
+import analyze_kpis_and_charts as akc
+import geo_tiles as geo
+import kpis as k
+import price_optimizer as opt
+import revenue_simulation as sim
+from pipeline_profiler import stage
+
+MAX_WORKERS = 4
+
+# Values supplied by the caller rather than computed by a node
+PIPELINE_INPUTS = ("df", "my_price", "est_units", "out_dir")
+
+_PLOT_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    func: Callable
+    inputs: Tuple[str, ...]
+    serial: bool = False     # hold the plot lock while running
+
+
+class Pipeline:
+    def __init__(self):
+        self.nodes: Dict[str, Node] = {}
+
+    def node(self, name: str, inputs: Iterable[str] = (), serial: bool = False):
+        """Decorator registering func as the node that produces `name`."""
+        def register(func: Callable) -> Callable:
+            if name in self.nodes:
+                raise ValueError(f"Duplicate pipeline node: {name}")
+            self.nodes[name] = Node(name, func, tuple(inputs), serial)
+            return func
+        return register
+
+    def required_nodes(self, outputs: Iterable[str], provided: Iterable[str]) -> Set[str]:
+        """All node names needed to produce outputs, not counting provided values."""
+        provided = set(provided)
+        needed: Set[str] = set()
+        stack = list(outputs)
+        while stack:
+            name = stack.pop()
+            if name in provided or name in needed:
+                continue
+            if name not in self.nodes:
+                raise KeyError(f"Unknown pipeline output or missing input: {name}")
+            needed.add(name)
+            stack.extend(self.nodes[name].inputs)
+        return needed
+
+    def run(self, outputs: Iterable[str], inputs: Dict, max_workers: int = MAX_WORKERS) -> Dict:
+        """Compute the requested outputs and return them as {name: value}."""
+        outputs = list(outputs)
+        values = dict(inputs)
+        pending = self.required_nodes(outputs, values)
+
+        def execute(node: Node):
+            args = [values[name] for name in node.inputs]
+            with stage(f"node:{node.name}"):
+                if node.serial:
+                    with _PLOT_LOCK:
+                        return node.func(*args)
+                return node.func(*args)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while pending or running:
+                ready = [n for n in pending if all(i in values for i in self.nodes[n].inputs)]
+                for name in ready:
+                    pending.discard(name)
+                    running[pool.submit(execute, self.nodes[name])] = name
+                if not running:
+                    raise ValueError(f"Pipeline has a dependency cycle among: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    values[running.pop(fut)] = fut.result()
+
+        return {name: values[name] for name in outputs}
+
+
+# -------------------------------------------------------------------
+# REPORT GRAPH
+# -------------------------------------------------------------------
+
+REPORT = Pipeline()
+
+# KPIs
+REPORT.node("priced", ["df"])(k.priced_listings)
+REPORT.node("market_avg", ["priced"])(k.market_avg)
+REPORT.node("market_min", ["priced"])(k.market_min)
+REPORT.node("market_max", ["priced"])(k.market_max)
+REPORT.node("price_gap", ["market_avg", "my_price"])(k.price_gap)
+REPORT.node("price_gap_pct", ["price_gap", "market_avg"])(k.price_gap_pct)
+REPORT.node("promo_pressure", ["priced"])(k.promo_pressure)
+REPORT.node("demand_signal", ["priced", "market_avg"])(k.demand_signal)
+REPORT.node("occ_index", ["demand_signal"])(k.occ_index)
+REPORT.node("recommended_price", ["my_price", "market_avg"])(k.recommended_price)
+REPORT.node("extra_per_unit", ["recommended_price", "my_price"])(k.extra_per_unit)
+REPORT.node("annual_uplift", ["extra_per_unit", "est_units"])(k.annual_uplift)
+REPORT.node("optimal_price", ["df", "my_price", "est_units"])(opt.optimal_price_for_market)
+
+KPI_NAMES = [
+    "market_avg", "market_min", "market_max", "price_gap", "price_gap_pct", "promo_pressure",
+    "occ_index", "recommended_price", "annual_uplift", "extra_per_unit",
+]
+
+
+@REPORT.node("kpis", KPI_NAMES)
+def kpi_dict(*values) -> Dict:
+    """Same dict as kpis.compute_market_kpis, assembled from the individual nodes."""
+    return dict(zip(KPI_NAMES, values))
+
+
+# Tables
+REPORT.node("money_on_table", ["kpis", "my_price", "est_units"])(adv.build_money_on_table)
+REPORT.node("price_scenarios", ["kpis", "my_price", "est_units"])(adv.build_scenario_table)
+REPORT.node("promo_roi", ["kpis", "my_price", "est_units"])(adv.build_promo_roi_table)
+REPORT.node("action", ["kpis"])(adv.classify_action)
+
+
+@REPORT.node("price_scenarios_mc", ["kpis", "my_price", "est_units"])
+def price_scenarios_mc(kpis: Dict, my_price: float, est_units: int) -> pd.DataFrame:
+    return sim.simulate_scenario_table(kpis, my_price, est_units, adv.SCENARIO_PRICE_CHANGES)
+
+
+REPORT.node("promo_roi_mc", ["kpis", "my_price", "est_units"])(sim.simulate_promo_roi_table)
+REPORT.node("geo_tiles", ["df"])(geo.build_tile_aggregates)
+
+
+# Charts – each chart node saves a PNG into out_dir and returns its path (None if skipped)
+def _fig_chart(name: str, fig_fn: Callable, inputs: List[str]):
+    def render(out_dir: Path, *args) -> Path:
+        path = Path(out_dir) / f"{name}.png"
+        fig = fig_fn(*args)
+        fig.savefig(path, dpi=150, bbox_inches="tight")
+        plt.close(fig)
+        return path
+    REPORT.node(f"{name}_chart", ["out_dir"] + inputs, serial=True)(render)
+
+
+def _saved_chart(name: str, chart_fn: Callable, inputs: List[str]):
+    def render(out_dir: Path, *args) -> Optional[Path]:
+        path = Path(out_dir) / f"{name}.png"
+        # Chart functions skip themselves (no file written) when the data is missing
+        path.unlink(missing_ok=True)
+        chart_fn(*args, path)
+        return path if path.exists() else None
+    REPORT.node(f"{name}_chart", ["out_dir"] + inputs, serial=True)(render)
+
+
+_fig_chart("price_comparison", akc.price_comparison_fig, ["df", "my_price"])
+_fig_chart("price_histogram", akc.price_histogram_fig, ["df"])
+_fig_chart("price_vs_distance", akc.price_vs_distance_fig, ["df", "my_price"])
+_fig_chart("rating_vs_price", akc.rating_vs_price_fig, ["df", "my_price"])
+_fig_chart("promo_pressure", akc.promo_pressure_fig, ["df"])
+_fig_chart("revenue_uplift", akc.revenue_uplift_fig, ["my_price", "kpis", "est_units"])
+_fig_chart("opportunity_quadrant", akc.opportunity_quadrant_fig, ["df", "my_price"])
+_fig_chart("rating_promo_matrix", akc.rating_promo_matrix_fig, ["df"])
+
+_saved_chart("top_underpriced", adv.top_underpriced_chart, ["df"])
+_saved_chart("discount_dependence", adv.discount_dependence_chart, ["df"])
+_saved_chart("price_rating_opportunity", adv.price_rating_opportunity_chart, ["df"])
+_saved_chart("neighborhood_heatmap", adv.neighborhood_heatmap, ["df"])
+_saved_chart("price_band_share", adv.price_band_share_chart, ["df"])
+_saved_chart("market_trend", adv.trend_over_time_chart, ["df", "my_price"])
+
+
+def _city_tile_heatmap(tiles: pd.DataFrame, output_path: Path):
+    geo.tile_heatmap(tiles, geo.CITY_ZOOM, output_path)
+
+
+_saved_chart("tile_heatmap", _city_tile_heatmap, ["geo_tiles"])
+
+
+def run_report(
+    df: pd.DataFrame,
+    outputs: Iterable[str],
+    my_price: float,
+    est_units: int,
+    out_dir: Path = Path("."),
+    max_workers: int = MAX_WORKERS,
+) -> Dict:
+    """Compute only the requested report outputs for one listing dataset."""
+    inputs = {"df": df, "my_price": my_price, "est_units": est_units, "out_dir": Path(out_dir)}
+    return REPORT.run(outputs, inputs, max_workers=max_workers)
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compute selected report outputs.")
+    parser.add_argument("outputs", nargs="*", default=["kpis"], help="Node names, e.g. recommended_price")
+    parser.add_argument("--csv", type=Path, default=akc.CSV_PATH)
+    parser.add_argument("--my-price", type=float, default=akc.MY_PRICE)
+    parser.add_argument("--est-units", type=int, default=akc.EST_UNITS)
+    parser.add_argument("--out-dir", type=Path, default=Path("."))
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--list", action="store_true", help="List available outputs and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, node in REPORT.nodes.items():
+            print(f"{name:<32} <- {', '.join(node.inputs)}")
+        return
+
+    if not args.csv.exists():
+        raise FileNotFoundError(f"{args.csv.resolve()} not found. Run build_dataset_from_html.py first.")
+
+    df = pd.read_csv(args.csv)
+    needed = REPORT.required_nodes(args.outputs, PIPELINE_INPUTS)
+    print(f"Loaded {len(df)} competitor rows; running {len(needed)} of {len(REPORT.nodes)} nodes.")
+
+    results = run_report(df, args.outputs, args.my_price, args.est_units, args.out_dir, args.workers)
+    for name, value in results.items():
+        if isinstance(value, pd.DataFrame):
+            print(f"\n{name}:\n{value.to_string(index=False)}")
+        elif isinstance(value, float):
+            print(f"{name}: {value:.2f}")
+        else:
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
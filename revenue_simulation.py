@@ -0,0 +1,124 @@
+# revenue_simulation.py
+#
+# Monte Carlo version of the scenario tables in advanced_analytics.py.
+#
+# build_scenario_table / build_promo_roi_table give one point estimate per
+# scenario using a fixed occupancy response. Here we draw many samples of the
+# uncertain inputs and evaluate every draw against every scenario at once
+# (samples x scenarios NumPy arrays), returning revenue percentiles and the
+# probability that each scenario beats the current price.
+#
+# Uncertain inputs per draw:
+#   - base occupancy:       demand index +/- noise
+#   - occupancy elasticity: occupancy points lost per 1.0 relative price change
+#                           (lognormal around the 0.5 used by build_scenario_table)
+#   - market drift:         relative move of competitor prices over the year
+#   - promo lift:           occupancy gained from a light / heavy promo
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+N_SAMPLES = 100_000
+
+BASE_OCC_SD = 0.03
+ELASTICITY_MEDIAN = 0.5
+ELASTICITY_LOG_SD = 0.5
+MARKET_DRIFT_SD = 0.03
+LIGHT_PROMO_LIFT = (0.05, 0.02)   # mean, sd
+HEAVY_PROMO_LIFT = (0.10, 0.04)
+HEAVY_PROMO_DISCOUNT = 5.0        # flat $ off, same as build_promo_roi_table
+
+PERCENTILES = [5, 50, 95]
+
+
+def draw_market_samples(base_occ: float, n_samples: int = N_SAMPLES, seed: Optional[int] = None) -> Dict:
+    """Draw the uncertain model inputs; every array has shape (n_samples, 1) for broadcasting."""
+    rng = np.random.default_rng(seed)
+    shape = (n_samples, 1)
+    return {
+        "base_occ": np.clip(rng.normal(base_occ, BASE_OCC_SD, size=shape), 0.0, 1.0),
+        "elasticity": rng.lognormal(np.log(ELASTICITY_MEDIAN), ELASTICITY_LOG_SD, size=shape),
+        "market_drift": rng.normal(0.0, MARKET_DRIFT_SD, size=shape),
+        "light_lift": rng.normal(*LIGHT_PROMO_LIFT, size=shape),
+        "heavy_lift": rng.normal(*HEAVY_PROMO_LIFT, size=shape),
+    }
+
+
+def _base_occ(kpis: Dict) -> float:
+    # Same fallback as the point-estimate tables
+    base_occ = kpis["occ_index"] / 100.0
+    return base_occ if base_occ > 0 else 0.9
+
+
+def _summarise(revenue: np.ndarray, current: np.ndarray) -> Dict[str, np.ndarray]:
+    """Percentiles / mean / P(uplift) per scenario column."""
+    delta = revenue - current
+    rev_pct = np.percentile(revenue, PERCENTILES, axis=0)
+    delta_pct = np.percentile(delta, PERCENTILES, axis=0)
+
+    out = {"revenue_mean": revenue.mean(axis=0)}
+    for i, p in enumerate(PERCENTILES):
+        out[f"revenue_p{p}"] = rev_pct[i]
+    for i, p in enumerate(PERCENTILES):
+        out[f"delta_p{p}"] = delta_pct[i]
+    out["prob_uplift"] = (delta > 0).mean(axis=0)
+    return out
+
+
+def simulate_scenario_table(
+    kpis: Dict,
+    my_price: float,
+    est_units: int,
+    price_changes: List[float],
+    n_samples: int = N_SAMPLES,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """Revenue distribution for each price change (e.g. advanced_analytics.SCENARIO_PRICE_CHANGES)."""
+    draws = draw_market_samples(_base_occ(kpis), n_samples, seed)
+    pct = np.asarray(price_changes, dtype=float)[None, :]          # (1, n_scenarios)
+
+    # A market drift of +3% makes our price 3% relatively cheaper
+    def occupancy(rel_change):
+        return np.clip(draws["base_occ"] - draws["elasticity"] * rel_change, 0.0, 1.0)
+
+    annual_units = est_units * 12
+    current = my_price * annual_units * occupancy(-draws["market_drift"])          # (n, 1)
+    revenue = my_price * (1.0 + pct) * annual_units * occupancy(pct - draws["market_drift"])
+
+    table = pd.DataFrame(
+        {"price_change_pct": pct[0] * 100, "new_price": my_price * (1.0 + pct[0])}
+    )
+    for name, values in _summarise(revenue, current).items():
+        table[name] = values
+    return table
+
+
+def simulate_promo_roi_table(
+    kpis: Dict,
+    my_price: float,
+    est_units: int,
+    n_samples: int = N_SAMPLES,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """Revenue distribution for the No / Light / Heavy promo scenarios of build_promo_roi_table."""
+    draws = draw_market_samples(_base_occ(kpis), n_samples, seed)
+
+    prices = np.array([my_price, my_price, my_price - HEAVY_PROMO_DISCOUNT])[None, :]
+    lift = np.hstack([np.zeros_like(draws["light_lift"]), draws["light_lift"], draws["heavy_lift"]])
+    occ = np.clip(draws["base_occ"] + lift, 0.0, 1.0)
+
+    revenue = prices * est_units * 12 * occ
+    current = revenue[:, :1]
+
+    table = pd.DataFrame(
+        {
+            "scenario": ["No promo", "Light promo", "Heavy promo"],
+            "price": prices[0],
+            "effective_discount_pct": [0.0, 5.0, HEAVY_PROMO_DISCOUNT / my_price * 100],
+        }
+    )
+    for name, values in _summarise(revenue, current).items():
+        table[name] = values
+    return table
@@ -0,0 +1,112 @@
+# snapshot_diff.py
+#
+# Change-data-capture between two scrapes of the same market.
+#
+# 1. Hash-joins the new snapshot against the previous one on the facility key
+#    (facility URL, or name|zip – see build_dataset_from_html.facility_keys)
+# 2. Emits only change events, each with old and new values:
+#      facility_appeared / facility_disappeared
+#      price_changed, promo_started, promo_ended, rating_changed
+# 3. Runs in time linear in the snapshot size, so downstream KPIs and alerts
+#    can process just the deltas
+#
+# Usage:
+#   python snapshot_diff.py old_listings.csv new_listings.csv [--output changes.csv]
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from build_dataset_from_html import facility_keys
+
+PRICE_TOLERANCE = 0.005      # ignore float noise below half a cent
+RATING_TOLERANCE = 0.05      # ratings are published to one decimal
+
+EVENT_COLUMNS = ["facility_key", "facility_name", "event", "field", "old_value", "new_value"]
+
+COMPARED_FIELDS = ["facility_name", "lowest_price", "starting_price", "promo_flag", "rating", "rating_count"]
+
+
+def _keyed(df: pd.DataFrame) -> pd.DataFrame:
+    snap = df.reindex(columns=COMPARED_FIELDS).copy()
+    snap["facility_key"] = facility_keys(df.reindex(columns=["facility_name", "zip_code", "relative_url"]))
+    snap["promo_flag"] = snap["promo_flag"].fillna(False).astype(bool)
+    return snap.drop_duplicates(subset=["facility_key"], keep="first")
+
+
+def _events(rows: pd.DataFrame, event: str, field: str, old_col: str, new_col: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "facility_key": rows["facility_key"].to_numpy(),
+            "facility_name": rows["facility_name_new"].fillna(rows["facility_name_old"]).to_numpy(),
+            "event": event,
+            "field": field,
+            "old_value": rows[old_col].to_numpy() if old_col else None,
+            "new_value": rows[new_col].to_numpy() if new_col else None,
+        }
+    )
+
+
+def _moved(old: pd.Series, new: pd.Series, tolerance: float) -> np.ndarray:
+    """True where a numeric value changed by more than tolerance (or appeared / vanished)."""
+    old_v = pd.to_numeric(old, errors="coerce").to_numpy(dtype=float)
+    new_v = pd.to_numeric(new, errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        changed = np.abs(new_v - old_v) > tolerance
+    return changed | (np.isnan(old_v) != np.isnan(new_v))
+
+
+def diff_snapshots(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Change events between two listing snapshots (one row per event)."""
+    joined = _keyed(old).merge(
+        _keyed(new), on="facility_key", how="outer", suffixes=("_old", "_new"), indicator=True
+    )
+
+    both = joined[joined["_merge"] == "both"]
+    promo_old, promo_new = both["promo_flag_old"].astype(bool), both["promo_flag_new"].astype(bool)
+
+    parts = [
+        _events(joined[joined["_merge"] == "right_only"], "facility_appeared", "lowest_price", None, "lowest_price_new"),
+        _events(joined[joined["_merge"] == "left_only"], "facility_disappeared", "lowest_price", "lowest_price_old", None),
+        _events(
+            both[_moved(both["lowest_price_old"], both["lowest_price_new"], PRICE_TOLERANCE)],
+            "price_changed", "lowest_price", "lowest_price_old", "lowest_price_new",
+        ),
+        _events(both[~promo_old & promo_new], "promo_started", "promo_flag", "promo_flag_old", "promo_flag_new"),
+        _events(both[promo_old & ~promo_new], "promo_ended", "promo_flag", "promo_flag_old", "promo_flag_new"),
+        _events(
+            both[_moved(both["rating_old"], both["rating_new"], RATING_TOLERANCE)],
+            "rating_changed", "rating", "rating_old", "rating_new",
+        ),
+    ]
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.concat(parts, ignore_index=True)[EVENT_COLUMNS]
+
+
+# -------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Change events between two listing snapshots.")
+    parser.add_argument("old_csv", type=Path)
+    parser.add_argument("new_csv", type=Path)
+    parser.add_argument("--output", type=Path, default=Path("snapshot_changes.csv"))
+    args = parser.parse_args()
+
+    events = diff_snapshots(pd.read_csv(args.old_csv), pd.read_csv(args.new_csv))
+    if events.empty:
+        print("No changes between snapshots.")
+        return
+
+    print(events["event"].value_counts().to_string())
+    events.to_csv(args.output, index=False)
+    print(f"\nSaved {len(events)} change events to: {args.output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
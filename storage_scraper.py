@@ -0,0 +1,147 @@
+# storage_scraper.py
+#
+# 1. Fetches Storage.com search result pages for a city, one page at a time
+# 2. Parses each page with the same card parser used for saved HTML files
+#    (facility cards plus the per-unit-size price table, in one pass)
+# 3. Yields the rows page by page so callers can render results as they arrive
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from build_dataset_from_html import facility_keys, parse_storage_page
+
+BASE_URL = "https://www.storage.com/self-storage"
+MAX_PAGES = 10
+REQUEST_TIMEOUT = 20  # seconds
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    )
+}
+
+
+def city_page_url(state: str, city: str, page: int = 1, base_url: str = BASE_URL) -> str:
+    """Build the search URL for one results page, e.g. .../california/san-diego/?page=2"""
+    url = f"{base_url.rstrip('/')}/{state.strip().lower()}/{city.strip().lower()}/"
+    if page > 1:
+        url += f"?page={page}"
+    return url
+
+
+def fetch_page_html(url: str, session: Optional[requests.Session] = None) -> str:
+    """Download one results page and return its HTML ('' if the page does not exist)."""
+    http = session or requests
+    resp = http.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+    if resp.status_code == 404:
+        return ""
+    resp.raise_for_status()
+    return resp.text
+
+
+def iter_city_market_page_tables(
+    state: str,
+    city: str,
+    zip_code: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    base_url: str = BASE_URL,
+) -> Iterator[Tuple[List[Dict], List[Dict]]]:
+    """
+    Yield (facility_rows, unit_rows) for each results page as soon as it is fetched.
+    Every unit size on the page comes from the same fetch and parse; unit_rows is
+    the long format from parse_storage_page (one row per facility x unit size).
+    Stops at the first page without facility cards or after max_pages.
+    """
+    seen_keys = set()
+
+    with requests.Session() as session:
+        for page in range(1, max_pages + 1):
+            html = fetch_page_html(city_page_url(state, city, page, base_url), session)
+            if not html:
+                break
+
+            df_page, df_units = parse_storage_page(html)
+            if df_page.empty:
+                break
+
+            # Result pages repeat "featured" facilities, on the same page and across
+            # pages – keep the first one
+            df_page["facility_key"] = facility_keys(df_page)
+            df_page = df_page.drop_duplicates("facility_key")
+            df_page = df_page[~df_page["facility_key"].isin(seen_keys)]
+            if df_page.empty:
+                break
+            seen_keys.update(df_page["facility_key"])
+
+            if not df_units.empty:
+                df_units["facility_key"] = facility_keys(df_units)
+                df_units = df_units.drop_duplicates(["facility_key", "unit_size"])
+                df_units = df_units[df_units["facility_key"].isin(df_page["facility_key"])]
+
+            df_page = df_page.drop(columns="facility_key").assign(search_zip=zip_code)
+            df_units = df_units.drop(columns="facility_key", errors="ignore").assign(search_zip=zip_code)
+            yield df_page.to_dict(orient="records"), df_units.to_dict(orient="records")
+
+
+def iter_city_market_pages(
+    state: str,
+    city: str,
+    zip_code: Optional[str] = None,
+    unit_size: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    base_url: str = BASE_URL,
+) -> Iterator[List[Dict]]:
+    """Yield the card-level listing rows of each results page as soon as it is fetched."""
+    for rows, _ in iter_city_market_page_tables(state, city, zip_code, max_pages, base_url):
+        for row in rows:
+            row["unit_size"] = unit_size
+        yield rows
+
+
+def scrape_city_market(
+    state: str,
+    city: str,
+    zip_code: Optional[str] = None,
+    unit_size: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    base_url: str = BASE_URL,
+) -> List[Dict]:
+    """Fetch every results page for a city and return all listing rows."""
+    rows: List[Dict] = []
+    for page_rows in iter_city_market_pages(
+        state, city, zip_code=zip_code, unit_size=unit_size, max_pages=max_pages, base_url=base_url
+    ):
+        rows.extend(page_rows)
+    return rows
+
+
+def scrape_city_market_tables(
+    state: str,
+    city: str,
+    zip_code: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    base_url: str = BASE_URL,
+) -> Tuple[List[Dict], List[Dict]]:
+    """Fetch every results page once and return (facility_rows, unit_rows)."""
+    facility_rows: List[Dict] = []
+    unit_rows: List[Dict] = []
+    for page_rows, page_units in iter_city_market_page_tables(state, city, zip_code, max_pages, base_url):
+        facility_rows.extend(page_rows)
+        unit_rows.extend(page_units)
+    return facility_rows, unit_rows
+
+
+def scrape_city_market_units(
+    state: str,
+    city: str,
+    zip_code: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    base_url: str = BASE_URL,
+) -> List[Dict]:
+    """Fetch every results page once and return the long-format unit-size rows."""
+    rows: List[Dict] = []
+    for _, unit_rows in iter_city_market_page_tables(state, city, zip_code, max_pages, base_url):
+        rows.extend(unit_rows)
+    return rows
@@ -0,0 +1,275 @@
+# synthetic_market.py
+#
+# 1. Generates synthetic competitor listings for N facilities across M markets
+# 2. Renders them as Storage.com-style search result pages (facility cards)
+# 3. Used by the benchmark suite so runs do not depend on live scraping
+# 4. FixtureServer serves those pages over local HTTP for the scraper / market watcher
+
+import http.server
+import json
+import threading
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# A few real-ish market centres to scatter facilities around
+MARKET_CENTERS = [
+    ("indianapolis", "IN", 39.7684, -86.1581),
+    ("san-diego", "CA", 32.7157, -117.1611),
+    ("austin", "TX", 30.2672, -97.7431),
+    ("columbus", "OH", 39.9612, -82.9988),
+    ("denver", "CO", 39.7392, -104.9903),
+    ("charlotte", "NC", 35.2271, -80.8431),
+]
+
+# Unit sizes and their price relative to the facility's cheapest (5x5) unit
+UNIT_SIZE_MULTIPLIERS = {"5x5": 1.0, "5x10": 1.35, "10x10": 1.9, "10x15": 2.4, "10x20": 2.9}
+
+BRANDS = ["Public Storage", "Extra Space Storage", "CubeSmart", "Life Storage", "StorQuest", "U-Haul"]
+MILES_PER_DEGREE = 69.0
+
+
+def generate_market_listings(n_facilities: int, n_markets: int = 1, seed: int = 42) -> pd.DataFrame:
+    """
+    Build a listing dataset with the same columns as parse_storage_cards_from_html,
+    plus a 'market' column. Facilities are split evenly across markets.
+
+    Distributions (roughly what we see on Storage.com):
+      - price: market base ~ $60–160, facility spread ~ ±20% (lognormal)
+      - promo: ~40% of facilities, 10–40% off the starting price
+      - rating: 3.0–5.0 skewed high, ~10% without ratings
+      - distance: gamma, most within 6 miles of the search centre
+    """
+    rng = np.random.default_rng(seed)
+    n = int(n_facilities)
+
+    market_idx = np.arange(n) % max(1, n_markets)
+    market_base = rng.uniform(60, 160, size=max(1, n_markets))
+
+    lowest_price = np.round(market_base[market_idx] * rng.lognormal(0.0, 0.2, size=n), 0)
+    promo_flag = rng.random(n) < 0.4
+    discount = rng.uniform(0.10, 0.40, size=n)
+    starting_price = np.where(promo_flag, np.round(lowest_price / (1 - discount), 0), np.nan)
+
+    rating = np.round(5.0 - rng.beta(1.5, 4.0, size=n) * 2.0, 1)
+    rating = np.where(rng.random(n) < 0.1, np.nan, rating)
+    rating_count = np.where(np.isnan(rating), np.nan, rng.negative_binomial(2, 0.02, size=n))
+
+    distance = np.round(np.minimum(rng.gamma(2.0, 2.0, size=n), 25.0), 1)
+    bearing = rng.uniform(0, 2 * np.pi, size=n)
+
+    rows: List[dict] = []
+    for i in range(n):
+        m = market_idx[i] % len(MARKET_CENTERS)
+        city, state, lat0, lon0 = MARKET_CENTERS[m]
+        market = f"{city}-{market_idx[i]}" if n_markets > len(MARKET_CENTERS) else city
+
+        lat = lat0 + distance[i] * np.cos(bearing[i]) / MILES_PER_DEGREE
+        lon = lon0 + distance[i] * np.sin(bearing[i]) / (MILES_PER_DEGREE * np.cos(np.radians(lat0)))
+        name = f"{BRANDS[i % len(BRANDS)]} #{i}"
+
+        rows.append(
+            {
+                "market": market,
+                "facility_name": name,
+                "relative_url": f"/self-storage/{state.lower()}/{city}/facility-{i}/",
+                "street": f"{100 + i} Main St",
+                "city": city.replace("-", " ").title(),
+                "state": state,
+                "zip_code": f"{10000 + (i * 37) % 89999:05d}",
+                "address_text": f"{100 + i} Main St, {city.replace('-', ' ').title()}, {state}",
+                "distance_miles": float(distance[i]),
+                "lowest_price": float(lowest_price[i]),
+                "starting_price": None if np.isnan(starting_price[i]) else float(starting_price[i]),
+                "price_range": "$$",
+                "promo_flag": bool(promo_flag[i]),
+                "rating": None if np.isnan(rating[i]) else float(rating[i]),
+                "rating_count": None if np.isnan(rating_count[i]) else int(rating_count[i]),
+                "latitude": round(float(lat), 6),
+                "longitude": round(float(lon), 6),
+            }
+        )
+
+    return pd.DataFrame(rows)
+
+
+def generate_unit_listings(df: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """
+    Long-format unit table (facility x unit size) for listings from
+    generate_market_listings, matching parse_storage_page's units frame.
+    The card's lowest_price is the 5x5 price; larger sizes scale from it with
+    some noise, ~15% of sizes are sold out, and promo facilities discount each
+    size independently.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for row in df.to_dict(orient="records"):
+        for size, mult in UNIT_SIZE_MULTIPLIERS.items():
+            if size != "5x5" and rng.random() < 0.15:
+                continue
+            price = row["lowest_price"] if size == "5x5" else round(row["lowest_price"] * mult * rng.uniform(0.9, 1.1))
+            promo = bool(row["promo_flag"]) and (size == "5x5" or rng.random() < 0.6)
+            original = row["starting_price"] if size == "5x5" and promo else (
+                round(price / (1 - rng.uniform(0.1, 0.4))) if promo else None
+            )
+            rows.append(
+                {
+                    **row,
+                    "unit_size": size,
+                    "lowest_price": float(price),
+                    "starting_price": None if original is None else float(original),
+                    "promo_flag": promo,
+                    "promo_text": "First month $1" if promo else None,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def render_unit_rows(units: list) -> str:
+    """Render the per-unit-size price table inside a card."""
+    html = []
+    for unit in units:
+        width, length = unit["unit_size"].split("x")
+        original = ""
+        if unit.get("starting_price") is not None and not pd.isna(unit.get("starting_price")):
+            original = f'<span class="unit-original-price">${unit["starting_price"]:,.0f}</span>'
+        promo = f'<span class="unit-promo">{unit["promo_text"]}</span>' if unit.get("promo_text") else ""
+        html.append(
+            '<div class="unit-row">'
+            f"<span class=\"unit-size\">{width}' x {length}'</span>"
+            f'{promo}{original}<span class="unit-price">${unit["lowest_price"]:,.0f}</span>'
+            "</div>"
+        )
+    return f'<div class="facility-units">{"".join(html)}</div>' if html else ""
+
+
+def render_facility_card(row: dict, units: Optional[list] = None) -> str:
+    """Render one listing (and optionally its unit-size table) as a Storage.com facility card."""
+    ld = {
+        "@type": "SelfStorage",
+        "name": row["facility_name"],
+        "url": row["relative_url"],
+        "priceRange": row.get("price_range"),
+        "address": {
+            "streetAddress": row["street"],
+            "addressLocality": row["city"],
+            "addressRegion": row["state"],
+            "postalCode": row["zip_code"],
+        },
+        "geo": {"latitude": row["latitude"], "longitude": row["longitude"]},
+    }
+    if row.get("rating") is not None and not pd.isna(row.get("rating")):
+        ld["aggregateRating"] = {"ratingValue": row["rating"], "ratingCount": row["rating_count"]}
+
+    starting = ""
+    if row.get("starting_price") is not None and not pd.isna(row.get("starting_price")):
+        starting = f'<span class="starting-price">${row["starting_price"]:,.0f}</span>'
+
+    return (
+        '<div class="facility-card">'
+        f'<script type="application/ld+json">{json.dumps(ld)}</script>'
+        f'<h3 class="facility-name">{row["facility_name"]}</h3>'
+        f'<span class="facility-address">{row["address_text"]}</span>'
+        f'<div class="facility-distance"><span>{row["distance_miles"]} miles</span></div>'
+        '<div class="facility-prices">'
+        f'{starting}<span class="lowest-price">${row["lowest_price"]:,.0f}</span>'
+        "</div>"
+        f"{render_unit_rows(units or [])}"
+        "</div>"
+    )
+
+
+def render_search_page(df: pd.DataFrame, units: Optional[pd.DataFrame] = None) -> str:
+    """
+    Render a full search results page containing one card per listing row.
+    Pass the unit table from generate_unit_listings to include per-size prices.
+    """
+    by_facility = {}
+    if units is not None:
+        for unit in units.to_dict(orient="records"):
+            by_facility.setdefault(unit["relative_url"], []).append(unit)
+    cards = "\n".join(
+        render_facility_card(row, by_facility.get(row["relative_url"]))
+        for row in df.to_dict(orient="records")
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Self Storage Units | Storage.com</title></head>"
+        f'<body><div class="search-results">\n{cards}\n</div></body></html>'
+    )
+
+
+def generate_market_pages(
+    n_facilities: int, n_markets: int = 1, page_size: int = 20, seed: int = 42
+) -> dict:
+    """Return {market: [page_html, ...]} with page_size cards (including unit tables) per page."""
+    df = generate_market_listings(n_facilities, n_markets, seed=seed)
+    units = generate_unit_listings(df, seed=seed)
+    pages = {}
+    for market, df_m in df.groupby("market", sort=False):
+        pages[market] = [
+            render_search_page(df_m.iloc[start:start + page_size], units)
+            for start in range(0, len(df_m), page_size)
+        ]
+    return pages
+
+
+# -------------------------------------------------------------------
+# LOCAL FIXTURE SERVER
+# -------------------------------------------------------------------
+
+class FixtureServer:
+    """
+    Serves synthetic result pages over HTTP so the scraper and market watcher can
+    run without touching Storage.com. URLs mirror storage_scraper.city_page_url:
+
+        http://127.0.0.1:<port>/<state>/<city>/?page=<n>
+
+    `pages` maps (state, city) -> [page_html, ...] and can be replaced while the
+    server runs to simulate competitors changing prices between scrapes.
+
+        with FixtureServer({("indiana", "indianapolis"): pages}) as server:
+            scrape_city_market("indiana", "indianapolis", base_url=server.base_url)
+    """
+
+    def __init__(self, pages: dict, host: str = "127.0.0.1", port: int = 0):
+        self.pages = pages
+        fixture = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [p for p in url.path.split("/") if p]
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+                market_pages = fixture.pages.get(tuple(parts[-2:]), []) if len(parts) >= 2 else []
+
+                if not 1 <= page <= len(market_pages):
+                    self.send_error(404)
+                    return
+                body = market_pages[page - 1].encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        return False
@@ -0,0 +1,142 @@
+# test_market_watcher.py
+#
+# Runs the market watcher against synthetic result pages served by
+# synthetic_market.FixtureServer.
+#
+#   python -m pytest -q test_market_watcher.py
+
+import asyncio
+
+import pytest
+
+import market_watcher
+from kpis import compute_market_kpis
+from market_watcher import MarketWatcher, WatchedMarket
+from synthetic_market import FixtureServer, generate_market_listings, generate_unit_listings, render_search_page
+
+STATE, CITY = "indiana", "indianapolis"
+
+
+@pytest.fixture
+def listings():
+    return generate_market_listings(30, seed=7)
+
+
+@pytest.fixture
+def report_calls(monkeypatch):
+    """Count recomputes by wrapping the report runner the watcher uses."""
+    calls = []
+    real_run_report = market_watcher.run_report
+
+    def counting_run_report(*args, **kwargs):
+        calls.append(args)
+        return real_run_report(*args, **kwargs)
+
+    monkeypatch.setattr(market_watcher, "run_report", counting_run_report)
+    return calls
+
+
+def _watcher(server, listings, tmp_path, alerts):
+    # Priced at the market average -> "Hold"
+    my_price = compute_market_kpis(listings, my_price=0)["market_avg"]
+    market = WatchedMarket(STATE, CITY, my_price=my_price)
+    return MarketWatcher(
+        [market], base_url=server.base_url, output_dir=tmp_path, outputs=["kpis", "action"],
+        on_alert=alerts.append,
+    )
+
+
+def test_unchanged_rescrape_recomputes_nothing(listings, report_calls, tmp_path):
+    alerts = []
+    with FixtureServer({(STATE, CITY): [render_search_page(listings)]}) as server:
+        watcher = _watcher(server, listings, tmp_path, alerts)
+        assert asyncio.run(watcher.run_once()) == [f"{STATE}/{CITY}"]
+        assert asyncio.run(watcher.run_once()) == []
+
+    assert len(report_calls) == 1
+    assert alerts == []
+
+
+def test_price_change_triggers_recompute(listings, report_calls, tmp_path):
+    alerts = []
+    with FixtureServer({(STATE, CITY): [render_search_page(listings)]}) as server:
+        watcher = _watcher(server, listings, tmp_path, alerts)
+        asyncio.run(watcher.run_once())
+
+        changed = listings.copy()
+        changed.loc[0, "lowest_price"] += 1
+        server.pages = {(STATE, CITY): [render_search_page(changed)]}
+        assert asyncio.run(watcher.run_once()) == [f"{STATE}/{CITY}"]
+
+    assert len(report_calls) == 2
+    assert watcher.state[f"{STATE}/{CITY}"].action == "Hold"
+    assert alerts == []
+
+
+def test_action_flip_fires_alert(listings, report_calls, tmp_path):
+    alerts = []
+    with FixtureServer({(STATE, CITY): [render_search_page(listings)]}) as server:
+        watcher = _watcher(server, listings, tmp_path, alerts)
+        asyncio.run(watcher.run_once())
+
+        # Competitors cut prices 30% -> we are far above market -> "Defend"
+        cheaper = listings.copy()
+        cheaper["lowest_price"] = (cheaper["lowest_price"] * 0.7).round()
+        server.pages = {(STATE, CITY): [render_search_page(cheaper)]}
+        asyncio.run(watcher.run_once())
+
+    assert len(alerts) == 1
+    assert (alerts[0].old_action, alerts[0].new_action) == ("Hold", "Defend")
+    assert alerts[0].market == f"{STATE}/{CITY}"
+
+
+def test_failing_market_does_not_abort_run_once(listings, monkeypatch, tmp_path):
+    real_scrape = market_watcher.scrape_city_market_tables
+
+    def flaky_scrape(state, city, **kwargs):
+        if city == "broken":
+            raise ConnectionError("site down")
+        return real_scrape(state, city, **kwargs)
+
+    monkeypatch.setattr(market_watcher, "scrape_city_market_tables", flaky_scrape)
+    with FixtureServer({(STATE, CITY): [render_search_page(listings)]}) as server:
+        watcher = MarketWatcher(
+            [WatchedMarket(STATE, "broken"), WatchedMarket(STATE, CITY)],
+            base_url=server.base_url, output_dir=tmp_path, outputs=["kpis", "action"],
+        )
+        assert asyncio.run(watcher.run_once()) == [f"{STATE}/{CITY}"]
+
+
+def test_unit_sizes_of_one_city_are_separate_markets(tmp_path):
+    small = WatchedMarket(STATE, CITY, unit_size="5x5")
+    large = WatchedMarket(STATE, CITY, unit_size="10x10")
+    watcher = MarketWatcher([small, large], output_dir=tmp_path)
+    assert set(watcher.state) == {f"{STATE}/{CITY}/5x5", f"{STATE}/{CITY}/10x10"}
+
+    with pytest.raises(ValueError):
+        MarketWatcher([small, WatchedMarket(STATE, CITY, unit_size="5x5", my_price=80)], output_dir=tmp_path)
+
+
+def test_unit_sizes_share_one_scrape_with_their_own_prices(listings, monkeypatch, tmp_path):
+    scrapes = []
+    real_scrape = market_watcher.scrape_city_market_tables
+
+    def counting_scrape(state, city, **kwargs):
+        scrapes.append((state, city))
+        return real_scrape(state, city, **kwargs)
+
+    monkeypatch.setattr(market_watcher, "scrape_city_market_tables", counting_scrape)
+    units = generate_unit_listings(listings)
+    with FixtureServer({(STATE, CITY): [render_search_page(listings, units)]}) as server:
+        watcher = MarketWatcher(
+            [WatchedMarket(STATE, CITY, unit_size="5x5"), WatchedMarket(STATE, CITY, unit_size="10x20")],
+            base_url=server.base_url, output_dir=tmp_path, outputs=["kpis", "action"],
+        )
+        assert asyncio.run(watcher.run_once()) == [f"{STATE}/{CITY}/5x5", f"{STATE}/{CITY}/10x20"]
+
+    assert scrapes == [(STATE, CITY)]
+    for size in ("5x5", "10x20"):
+        expected = compute_market_kpis(units[units["unit_size"] == size], my_price=60)
+        assert watcher.state[f"{STATE}/{CITY}/{size}"].kpis["market_avg"] == pytest.approx(expected["market_avg"])
+    small, large = (watcher.state[f"{STATE}/{CITY}/{size}"].kpis for size in ("5x5", "10x20"))
+    assert large["market_avg"] > small["market_avg"]